@@ -0,0 +1,82 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from logic import lattice_best_move
+
+
+class RangeSolution:
+    """
+    Evaluations and best first moves for every starting number in range(start, stop, step).
+    Stored as two byte arrays (one entry per starting number) instead of a dict of Python objects:
+      - evaluations[i]: +1 / -1, same as minimax on the root,
+      - best_moves[i]:  divisor the player to move should pick first (0 if there are no moves).
+    """
+    def __init__(self, start: int, stop: int, step: int, is_first_player_move: bool,
+                 evaluations: array, best_moves: array):
+        self.numbers = range(start, stop, step)
+        self.is_first_player_move = is_first_player_move
+        self.evaluations = evaluations
+        self.best_moves = best_moves
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __getitem__(self, number: int) -> Tuple[int, int]:
+        """
+        Returns (evaluation_value, best divisor) for a starting number of the range.
+        """
+        index = self.numbers.index(number)
+        return self.evaluations[index], self.best_moves[index]
+
+
+def _solve_chunk(numbers: range, is_first_player_move: bool) -> Tuple[bytes, bytes]:
+    """
+    Solves one chunk of starting numbers inside a worker process.
+    Results go back as raw bytes, which is much cheaper to send between processes than lists.
+    """
+    evaluations = array('b')
+    best_moves = array('b')
+    for number in numbers:
+        value, divisor = lattice_best_move(number, 0, 0, is_first_player_move)
+        evaluations.append(value)
+        best_moves.append(divisor)
+    return evaluations.tobytes(), best_moves.tobytes()
+
+
+def _split(numbers: range, chunks: int) -> List[range]:
+    size = max(1, -(-len(numbers) // chunks))
+    return [numbers[i:i + size] for i in range(0, len(numbers), size)]
+
+
+def solve_range(start: int, stop: int, step: int = 1, workers: Optional[int] = None,
+                is_first_player_move: bool = True) -> RangeSolution:
+    """
+    Solves every starting number in range(start, stop, step), spread over 'workers' processes
+    (all CPUs by default, 1 = no pool).
+
+    Positions are solved on the (a, b, c, parity) lattice (see lattice_value): every sub-position
+    with the same exponents of 2, 3 and 5 has the same answer no matter which starting number
+    it came from, so no worker ever searches a shared sub-position twice and workers don't need
+    to send anything to each other. Each chunk is just a range, so starting the work is free too.
+
+    Example: solve_range(40_020, 49_981, 60) covers everything generate_random_numbers can produce.
+    """
+    numbers = range(start, stop, step)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(numbers) < 2:
+        results = [_solve_chunk(numbers, is_first_player_move)]
+    else:
+        # A few chunks per worker, so a slow chunk doesn't leave the other workers idle at the end.
+        chunks = _split(numbers, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solve_chunk, chunks, [is_first_player_move] * len(chunks)))
+
+    evaluations = array('b')
+    best_moves = array('b')
+    for evaluation_bytes, best_move_bytes in results:
+        evaluations.frombytes(evaluation_bytes)
+        best_moves.frombytes(best_move_bytes)
+    return RangeSolution(start, stop, step, is_first_player_move, evaluations, best_moves)
@@ -0,0 +1,254 @@
+"""
+Benchmarks for tree generation and every search engine.
+
+Run it with `python -m benchmark`. It times every engine on the starting numbers
+generate_random_numbers gives for fixed seeds, and on a few synthetic numbers,
+then writes the results to a JSON file. With a baseline file it also compares
+against it and exits with status 1 if anything got slower than the threshold allows.
+It also exits with status 1 if the parallel search's shared bound stops saving nodes (check_bound_sharing).
+
+    python -m benchmark --save-baseline        # store the current numbers as the baseline
+    python -m benchmark --threshold 0.2        # fail if anything is more than 20% slower
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from graph import build_graph, graph_minimax
+from logic import (ITERATIVE, RECURSIVE, Node, SearchStats, TranspositionTable, alpha_beta, choose_move,
+                   generate_random_numbers, generate_tree, lattice_minimax, minimax)
+from parallel import parallel_choose_move
+
+DEFAULT_SEEDS = [1, 2, 3]
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Synthetic numbers: a wide one (many transpositions) and a deep one (a 1000 ply chain,
+# too deep for the recursive engines).
+SYNTHETIC_NUMBERS = {
+    "wide": 2 ** 6 * 3 ** 5 * 5 ** 4 * 7,
+    "deep": 2 ** 2000 * 7,
+}
+
+
+def _tree(number: int) -> Node:
+    root = Node(number, 0, 0, 0, True)
+    generate_tree(root)
+    return root
+
+
+def _graph(number: int):
+    return build_graph(Node(number, 0, 0, 0, True))
+
+
+def _lattice(number: int, stats: SearchStats) -> int:
+    # The lattice solver looks at one position only: the one it's given.
+    stats.visit(0)
+    return lattice_minimax(number, 0, 0, True)
+
+
+# Every engine is (prepare, run): prepare(number) builds whatever the engine needs and isn't timed,
+# run(prepared, number, stats) is the part that's timed.
+ENGINES: Dict[str, Tuple[Callable, Callable]] = {
+    "generate_tree": (
+        lambda number: None,
+        lambda _, number, stats: generate_tree(Node(number, 0, 0, 0, True), stats)),
+    "build_graph": (
+        lambda number: None,
+        lambda _, number, stats: build_graph(Node(number, 0, 0, 0, True), stats)),
+    "minimax": (
+        _tree,
+        lambda root, number, stats: minimax(root, True, None, RECURSIVE, stats)),
+    "minimax_iterative": (
+        _tree,
+        lambda root, number, stats: minimax(root, True, None, ITERATIVE, stats)),
+    "minimax_table": (
+        _tree,
+        lambda root, number, stats: minimax(root, True, TranspositionTable(), ITERATIVE, stats)),
+    "alpha_beta": (
+        _tree,
+        lambda root, number, stats: alpha_beta(root, -math.inf, math.inf, True, None, RECURSIVE, stats)),
+    "alpha_beta_iterative": (
+        _tree,
+        lambda root, number, stats: alpha_beta(root, -math.inf, math.inf, True, None, ITERATIVE, stats)),
+    "graph_minimax": (
+        _graph,
+        lambda graph, number, stats: graph_minimax(graph, stats)),
+    "lazy_alpha_beta": (
+        lambda number: None,
+        lambda _, number, stats: choose_move(Node(number, 0, 0, 0, True), True, TranspositionTable(), stats)),
+    "parallel_alpha_beta": (
+        lambda number: None,
+        lambda _, number, stats: parallel_choose_move(Node(number, 0, 0, 0, True), True, TranspositionTable(), stats)),
+    "parallel_alpha_beta_unshared": (
+        lambda number: None,
+        lambda _, number, stats: parallel_choose_move(Node(number, 0, 0, 0, True), True, TranspositionTable(), stats,
+                                                      share_bound=False)),
+    "lattice": (
+        lambda number: None,
+        lambda _, number, stats: _lattice(number, stats)),
+}
+
+
+def benchmark_cases(seeds: List[int]) -> Dict[str, List[int]]:
+    """
+    Returns {case name: starting numbers}. Seeded cases use exactly what generate_random_numbers gives.
+    """
+    cases = {}
+    for seed in seeds:
+        random.seed(seed)
+        cases[f"random-seed{seed}"] = generate_random_numbers()
+    for name, number in SYNTHETIC_NUMBERS.items():
+        cases[f"synthetic-{name}"] = [number]
+    return cases
+
+
+def run_engine(engine: str, numbers: List[int], repeat: int) -> Dict[str, object]:
+    """
+    Runs one engine on all 'numbers'. Time is the best of 'repeat' runs (less noise than the mean);
+    peak memory comes from one more run with tracemalloc, which is too slow to time.
+    """
+    prepare, run = ENGINES[engine]
+    best_seconds = math.inf
+    stats = None
+    try:
+        prepared = [prepare(number) for number in numbers]
+        for _ in range(repeat):
+            stats = SearchStats()
+            started = time.perf_counter()
+            for item, number in zip(prepared, numbers):
+                run(item, number, stats)
+            best_seconds = min(best_seconds, time.perf_counter() - started)
+
+        memory_stats = SearchStats(track_memory=True)
+        with memory_stats.phase("run"):
+            for item, number in zip(prepared, numbers):
+                run(item, number, memory_stats)
+    except RecursionError:
+        return {"skipped": "recursion limit"}
+
+    return {
+        "seconds": best_seconds,
+        "nodes": stats.nodes,
+        "nodes_per_second": stats.nodes / best_seconds if best_seconds > 0 else 0.0,
+        "peak_memory": memory_stats.peak_memory["run"],
+    }
+
+
+def run_benchmarks(seeds: List[int], repeat: int, engines: Optional[List[str]] = None) -> Dict[str, object]:
+    results = {}
+    for case, numbers in benchmark_cases(seeds).items():
+        for engine in engines or ENGINES:
+            key = f"{case}/{engine}"
+            results[key] = run_engine(engine, numbers, repeat)
+            print(f"{key:40} {format_result(results[key])}", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seeds": seeds,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def check_bound_sharing(seeds: List[int]) -> List[str]:
+    """
+    Checks that parallel_choose_move's shared bound really cuts nodes. It runs with one worker, so the
+    tasks run one after another and the node counts don't depend on timing. Returns a message for every
+    case where sharing visited more nodes than open windows, and one more if it saved nothing in total.
+    """
+    problems = []
+    totals = [0, 0]
+    for case, numbers in benchmark_cases(seeds).items():
+        nodes = []
+        for share_bound in (False, True):
+            stats = SearchStats()
+            try:
+                for number in numbers:
+                    parallel_choose_move(Node(number, 0, 0, 0, True), True, TranspositionTable(), stats, 1, 1,
+                                         share_bound)
+            except RecursionError:
+                break
+            nodes.append(stats.nodes)
+        if len(nodes) < 2:
+            continue
+        print(f"{case + '/bound sharing':40} {nodes[0]:10} nodes without, {nodes[1]:10} with", flush=True)
+        totals[0] += nodes[0]
+        totals[1] += nodes[1]
+        if nodes[1] > nodes[0]:
+            problems.append(f"{case}: sharing the bound visited {nodes[1]} nodes, {nodes[0]} without")
+    if totals[1] >= totals[0]:
+        problems.append(f"sharing the bound saved no nodes ({totals[1]} with, {totals[0]} without)")
+    return problems
+
+
+def format_result(result: Dict[str, object]) -> str:
+    if "skipped" in result:
+        return f"skipped ({result['skipped']})"
+    return (f"{result['seconds'] * 1000:10.3f} ms {result['nodes']:10} nodes "
+            f"{result['nodes_per_second']:12.0f} nodes/s {result['peak_memory'] / 1024:10.1f} KiB")
+
+
+def find_regressions(results: Dict[str, object], baseline: Dict[str, object], threshold: float) -> List[str]:
+    """
+    Compares run times with the baseline. Returns a message for every benchmark that took more than
+    (1 + threshold) times its baseline time. Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for key, result in results["results"].items():
+        old = baseline["results"].get(key)
+        if old is None or "seconds" not in old or "seconds" not in result:
+            continue
+        if result["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append(f"{key}: {old['seconds'] * 1000:.3f} ms -> {result['seconds'] * 1000:.3f} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tree generation and the search engines.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), help="only run these engines")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, 0.25 = 25%% slower")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file too")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.seeds, args.repeat, args.engines)
+    sharing_problems = check_bound_sharing(args.seeds)
+    for problem in sharing_problems:
+        print(f"SHARING {problem}")
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 1 if sharing_problems else 0
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}, nothing to compare with")
+        return 1 if sharing_problems else 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions or sharing_problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
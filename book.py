@@ -0,0 +1,126 @@
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from typing import Optional, Tuple
+
+from logic import STANDARD_RULES, Node, lattice_best_move
+
+# File layout (little-endian):
+#   header: MAGIC (8 bytes), number of positions n (u64)
+#   keys:   n x u64, sorted, key = number << 2 | parity << 1 | is_maximizing
+#   values: n x i8, evaluation_value (+1 / -1)
+#   moves:  n x i8, best divisor (0 if the game is over)
+MAGIC = b"MIPBOOK1"
+HEADER = struct.Struct("<8sQ")
+KEY = struct.Struct("<Q")
+MAX_NUMBER = 1 << 62
+
+
+def make_key(number: int, parity: int, is_maximizing: bool) -> int:
+    return number << 2 | parity << 1 | int(is_maximizing)
+
+
+def reachable_positions(start: int, stop: int, step: int = 1) -> set:
+    """
+    Returns every (number, (score + bank) % 2) reachable from the starting numbers in range(start, stop, step).
+    That pair is all the outcome depends on, apart from whose turn it is.
+    """
+    positions = set()
+    for number in range(start, stop, step):
+        if number >= MAX_NUMBER:
+            raise ValueError(f"{number} is too big for the opening book")
+        stack = [(number, 0)]
+        while stack:
+            position = stack.pop()
+            if position in positions:
+                continue
+            positions.add(position)
+            current, parity = position
+            for divisor in STANDARD_RULES.moves(current):
+                child = current // divisor
+                bank_change, score_change = STANDARD_RULES.transition(child)
+                stack.append((child, (parity + score_change + bank_change) % 2))
+    return positions
+
+
+def build_book(path: str, start: int, stop: int, step: int = 1) -> int:
+    """
+    Solves every position reachable from range(start, stop, step), for both players to move,
+    and writes them to 'path'. Returns the number of positions written.
+    """
+    entries = []
+    for number, parity in reachable_positions(start, stop, step):
+        for is_maximizing in (True, False):
+            value, divisor = lattice_best_move(number, parity, 0, is_maximizing)
+            entries.append((make_key(number, parity, is_maximizing), value, divisor))
+    entries.sort()
+
+    keys = array('Q', (entry[0] for entry in entries))
+    values = array('b', (entry[1] for entry in entries))
+    moves = array('b', (entry[2] for entry in entries))
+    if sys.byteorder == "big":
+        keys.byteswap()
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        file.write(keys.tobytes())
+        file.write(values.tobytes())
+        file.write(moves.tobytes())
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    Read-only view of a file written by build_book. The file is memory-mapped, so opening it is instant
+    and only the pages a lookup touches are read from disk. Lookups are a binary search over the sorted keys.
+    """
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.keys_offset = HEADER.size
+        self.values_offset = self.keys_offset + KEY.size * self.size
+        self.moves_offset = self.values_offset + self.size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(self, node: Node, is_maximizing: bool) -> Optional[Tuple[int, int]]:
+        """
+        Returns (evaluation_value, best divisor) for 'node', or None if it's not in the book.
+        """
+        if node.number >= MAX_NUMBER:
+            return None
+        key = make_key(node.number, (node.score + node.bank) % 2, is_maximizing)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, self.keys_offset + KEY.size * middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.size or KEY.unpack_from(self.data, self.keys_offset + KEY.size * low)[0] != key:
+            return None
+        value = struct.unpack_from("<b", self.data, self.values_offset + low)[0]
+        divisor = struct.unpack_from("<b", self.data, self.moves_offset + low)[0]
+        return value, divisor
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the opening book for a range of starting numbers.")
+    parser.add_argument("path", nargs="?", default="opening_book.bin")
+    parser.add_argument("--start", type=int, default=40_020)
+    parser.add_argument("--stop", type=int, default=49_980 + 1)
+    parser.add_argument("--step", type=int, default=60)
+    args = parser.parse_args()
+    count = build_book(args.path, args.start, args.stop, args.step)
+    print(f"Wrote {count} positions to {args.path}")
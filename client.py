@@ -0,0 +1,112 @@
+"""
+Client for server.py, and a small load test built on it.
+
+    python client.py --games 1000 --concurrency 200           # against python server.py
+    python client.py --unix /tmp/mip.sock --games 1000
+
+Every game picks its moves at random and plays until the end; at the end it prints games/s and requests/s.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Dict, Optional
+
+from server import DEFAULT_HOST, DEFAULT_PORT, LINE_LIMIT
+
+
+class GameClient:
+    """
+    One connection to the server. Requests can be sent from many tasks at once:
+    each gets an "id", and the answers are matched back to them by it.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.request_ids = itertools.count(1)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                      path: Optional[str] = None) -> "GameClient":
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def receive(self) -> None:
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("The server closed the connection"))
+
+    async def request(self, op: str, **fields) -> dict:
+        """
+        Sends one request and waits for its answer (the decoded JSON object).
+        """
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(json.dumps({"op": op, "id": request_id, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+async def play_random_game(client: GameClient, rng: random.Random) -> int:
+    """
+    Plays one game with random moves for the player. Returns the number of requests it took.
+    """
+    response = await client.request("new", first=rng.choice(["player", "computer"]))
+    session = response["session"]
+    requests = 1
+    while not response["state"]["game_over"]:
+        response = await client.request("move", session=session, divisor=rng.choice(response["state"]["moves"]))
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        requests += 1
+    await client.request("close", session=session)
+    return requests + 1
+
+
+async def load_test(games: int, concurrency: int, connections: int, host: str, port: int,
+                    path: Optional[str], seed: Optional[int]) -> None:
+    clients = [await GameClient.connect(host, port, path) for _ in range(connections)]
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_game(number: int) -> int:
+        async with semaphore:
+            return await play_random_game(clients[number % connections], random.Random(rng.random()))
+
+    started = time.perf_counter()
+    requests = sum(await asyncio.gather(*(one_game(number) for number in range(games))))
+    seconds = time.perf_counter() - started
+    for client in clients:
+        await client.close()
+    print(f"{games} games, {requests} requests in {seconds:.2f} s: "
+          f"{games / seconds:.0f} games/s, {requests / seconds:.0f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for server.py: plays random games.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100, help="games in progress at the same time")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    asyncio.run(load_test(args.games, args.concurrency, args.connections, args.host, args.port, args.unix, args.seed))
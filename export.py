@@ -0,0 +1,136 @@
+"""
+Streams a game graph to a file, every position once.
+
+    python export.py 48300 --output tree.jsonl              # one JSON object per position
+    python export.py 48300 --format edges --output tree.bin # binary edge list
+
+generate_tree shares positions that can be reached in several ways, so walking its children
+path by path repeats them; traverse() gives each position one index and yields it once.
+It doesn't need a built tree either: positions without children are expanded on the fly,
+so a huge game can be written out without ever holding its tree in memory.
+"""
+import argparse
+import heapq
+import json
+import math
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from logic import Node, create_child, lattice_minimax
+
+# Binary edge list (little-endian): MAGIC, then one record per edge until the end of the file.
+EDGES_MAGIC = b"MIPEDGE1"
+EDGE = struct.Struct("<IIB")
+
+
+def _state_key(node: Node) -> Tuple[int, int, bool, int]:
+    # generate_tree's key without the number: traverse() already groups the positions by number.
+    return node.score, node.bank, node.is_first_player_move, node.divisor
+
+
+def traverse(root: Node) -> Iterator[Tuple[int, Node, List[int]]]:
+    """
+    Walks over every position reachable from 'root', each yielded once as (index, node, indices of its children).
+    The root is index 0, the others are numbered in the order they're first reached.
+    Uses node.children where the tree was built, and creates the children otherwise (they're not kept).
+
+    Every move makes the number smaller, so positions are expanded from the biggest number down:
+    once the walk is at a number, all positions with it have been reached, and nothing can reach
+    them again. Their duplicate-check keys are dropped right there, so memory grows with the width
+    of the frontier, not with the size of the graph.
+    """
+    # {number: {_state_key: index}}, only for the numbers still in the frontier.
+    indices: Dict[int, Dict[Tuple[int, int, bool, int], int]] = {root.number: {_state_key(root): 0}}
+    count = 1
+    # (-number, index, node): biggest number first, ties in the order they were reached.
+    frontier = [(-root.number, 0, root)]
+    while frontier:
+        _, index, node = heapq.heappop(frontier)
+        indices.pop(node.number, None)
+        children = node.children or [create_child(node, divisor) for divisor in node.get_possible_moves()]
+        child_indices = []
+        for child in children:
+            seen = indices.setdefault(child.number, {})
+            key = _state_key(child)
+            child_index = seen.get(key)
+            if child_index is None:
+                child_index = seen[key] = count
+                count += 1
+                heapq.heappush(frontier, (-child.number, child_index, child))
+            child_indices.append(child_index)
+        yield index, node, child_indices
+
+
+def node_record(index: int, node: Node, children: List[int], evaluate: bool = False) -> dict:
+    """
+    The JSON object written for a position. evaluation_value is included once it's known
+    (or always, with evaluate=True: then it's worked out on the lattice).
+    """
+    record = {
+        "id": index,
+        "number": node.number,
+        "score": node.score,
+        "bank": node.bank,
+        "divisor": node.divisor,
+        "is_first_player_move": node.is_first_player_move,
+        "children": children,
+    }
+    if evaluate:
+        record["evaluation_value"] = lattice_minimax(node.number, node.score, node.bank, node.is_first_player_move)
+    elif not math.isinf(node.evaluation_value):
+        record["evaluation_value"] = node.evaluation_value
+    if not children:
+        record["final_score"] = node.compute_final_score()
+    return record
+
+
+def export_jsonl(root: Node, path: str, evaluate: bool = False) -> int:
+    """
+    Writes every position reachable from 'root' to 'path', one JSON object per line. Returns how many.
+    """
+    count = 0
+    with open(path, "w") as file:
+        for index, node, children in traverse(root):
+            file.write(json.dumps(node_record(index, node, children, evaluate)) + "\n")
+            count += 1
+    return count
+
+
+def export_edges(root: Node, path: str) -> int:
+    """
+    Writes the graph as a binary edge list: (parent index, child index, divisor) per edge,
+    with the indices of traverse(). Returns the number of edges.
+    """
+    count = 0
+    with open(path, "wb") as file:
+        file.write(EDGES_MAGIC)
+        for index, node, children in traverse(root):
+            for child, divisor in zip(children, node.get_possible_moves()):
+                file.write(EDGE.pack(index, child, divisor))
+                count += 1
+    return count
+
+
+def read_edges(file: BinaryIO) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yields (parent index, child index, divisor) from a file written by export_edges.
+    """
+    if file.read(len(EDGES_MAGIC)) != EDGES_MAGIC:
+        raise ValueError("Not an edge list file")
+    while record := file.read(EDGE.size):
+        yield EDGE.unpack(record)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the game graph of a starting number to a file.")
+    parser.add_argument("number", type=int)
+    parser.add_argument("--format", choices=["jsonl", "edges"], default="jsonl")
+    parser.add_argument("--output", default="tree.jsonl")
+    parser.add_argument("--second", action="store_true", help="the second player moves first")
+    parser.add_argument("--evaluate", action="store_true", help="include every position's evaluation_value")
+    args = parser.parse_args()
+    start = Node(args.number, 0, 0, 0, not args.second)
+    if args.format == "jsonl":
+        print(f"Wrote {export_jsonl(start, args.output, args.evaluate)} positions to {args.output}")
+    else:
+        print(f"Wrote {export_edges(start, args.output)} edges to {args.output}")
@@ -0,0 +1,318 @@
+import argparse
+import bisect
+import itertools
+import mmap
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Append-only log of finished games, plus an index of fixed-size columns next to it.
+#
+# Log file (little-endian), one record per game:
+#   number length in bytes (u16), flags (u8: bit 0 = the player moved first),
+#   algorithm (u8, index into ALGORITHMS), final score (i32), final bank (u32), move count (u16),
+#   then the starting number (any size) and one byte per move (the divisor).
+#
+# Index files, entry i describes game i:
+#   <log>.offsets: u64, where the game's record starts in the log,
+#   <log>.numbers: u64, the starting number (its lowest 64 bits if it's bigger),
+#   <log>.meta:    u8, algorithm << 4 | player moved first << 3 | player lost << 2 | first move code
+#                  (first move code: 0 = no moves, 1 / 2 / 3 = divided by 3 / 4 / 5).
+# And one more, sorted instead of in game order:
+#   <log>.by_number: (starting number's lowest 64 bits, game id) pairs, big-endian u64s, so the bytes
+#                    sort like the pairs. Brought up to date by the first query after new games.
+# Queries run over the memory-mapped index files: games_from is a binary search, and the counts are
+# C-speed bytes.count over chunks of the meta column, so they stay fast with tens of millions of games.
+# Like in GameUI, the player is the maximizing player: an even final score is a win.
+# "Opening book" is for games where every computer move came from the opening book (book.py).
+ALGORITHMS = ("Minimax", "Alpha-beta", "Iterative deepening", "Opening book")
+RECORD = struct.Struct("<HBBiIH")
+OFFSET = struct.Struct("<Q")
+NUMBER = struct.Struct("<Q")
+BY_NUMBER = struct.Struct(">QQ")
+# Bytes of the meta column counted at a time (the column itself is never copied whole).
+COUNT_CHUNK = 1 << 20
+# Most new games sorted at once when they're added to <log>.by_number.
+SORT_CHUNK = 1 << 20
+MASK_64 = (1 << 64) - 1
+FIRST_MOVE_CODES = {0: 0, 3: 1, 4: 2, 5: 3}
+FIRST_MOVES = {code: divisor for divisor, code in FIRST_MOVE_CODES.items()}
+
+
+class GameRecord(NamedTuple):
+    number: int
+    player_first: bool
+    algorithm: str
+    moves: Tuple[int, ...]
+    score: int
+    bank: int
+
+    @property
+    def final_score(self) -> int:
+        # Same as Node.compute_final_score
+        return self.score - self.bank if self.score % 2 == 0 else self.score + self.bank
+
+    @property
+    def player_won(self) -> bool:
+        return self.final_score % 2 == 0
+
+
+class _SortedEntries:
+    """
+    The packed entries of a by-number index as a read-only sequence, so bisect can search it in place.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data) // BY_NUMBER.size
+
+    def __getitem__(self, index: int) -> bytes:
+        return self.data[index * BY_NUMBER.size:(index + 1) * BY_NUMBER.size]
+
+
+def _meta(record: GameRecord) -> int:
+    first_move = FIRST_MOVE_CODES[record.moves[0] if record.moves else 0]
+    return (ALGORITHMS.index(record.algorithm) << 4 | int(record.player_first) << 3
+            | int(not record.player_won) << 2 | first_move)
+
+
+class GameLog:
+    """
+    Appends finished games to 'path' and answers queries about them.
+    The index is rebuilt from the log if it doesn't match it (e.g. after a crash in the middle of an append).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.log = open(path, "ab+")
+        self.offsets = open(path + ".offsets", "ab+")
+        self.numbers = open(path + ".numbers", "ab+")
+        self.meta = open(path + ".meta", "ab+")
+        self.by_number_path = path + ".by_number"
+        if not self.index_matches_log():
+            self.rebuild_index()
+
+    def __len__(self) -> int:
+        return os.fstat(self.meta.fileno()).st_size
+
+    def index_matches_log(self) -> bool:
+        count = len(self)
+        if (os.fstat(self.offsets.fileno()).st_size != OFFSET.size * count
+                or os.fstat(self.numbers.fileno()).st_size != NUMBER.size * count):
+            return False
+        log_size = os.fstat(self.log.fileno()).st_size
+        if count == 0:
+            return log_size == 0
+        self.offsets.seek(OFFSET.size * (count - 1))
+        last_offset = OFFSET.unpack(self.offsets.read(OFFSET.size))[0]
+        if last_offset + RECORD.size > log_size:
+            return False
+        return last_offset + self._read_record(last_offset)[1] == log_size
+
+    def rebuild_index(self) -> None:
+        """
+        Writes the index again from the log. A record cut off at the end of the log is dropped.
+        """
+        for file in (self.offsets, self.numbers, self.meta):
+            file.truncate(0)
+        offset = 0
+        log_size = os.fstat(self.log.fileno()).st_size
+        while offset + RECORD.size <= log_size:
+            record, size = self._read_record(offset)
+            if offset + size > log_size:
+                break
+            self._append_index(offset, record)
+            offset += size
+        self.log.truncate(offset)
+        self.flush()
+        # Sorted from scratch by the next query.
+        if os.path.exists(self.by_number_path):
+            os.remove(self.by_number_path)
+
+    def _read_record(self, offset: int) -> Tuple[GameRecord, int]:
+        """
+        Returns the record at 'offset' and its size in bytes.
+        """
+        self.log.seek(offset)
+        number_size, flags, algorithm, score, bank, move_count = RECORD.unpack(self.log.read(RECORD.size))
+        number = int.from_bytes(self.log.read(number_size), "little")
+        moves = tuple(self.log.read(move_count))
+        record = GameRecord(number, bool(flags & 1), ALGORITHMS[algorithm], moves, score, bank)
+        return record, RECORD.size + number_size + move_count
+
+    def _append_index(self, offset: int, record: GameRecord) -> None:
+        self.offsets.write(OFFSET.pack(offset))
+        self.numbers.write(NUMBER.pack(record.number & MASK_64))
+        self.meta.write(bytes([_meta(record)]))
+
+    def append(self, record: GameRecord) -> int:
+        """
+        Adds a finished game and returns its id (ids count from 0 in the order games were added).
+        The log is written before the index, so a crash never leaves an index entry without its game.
+        """
+        if record.algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {record.algorithm}")
+        number = record.number.to_bytes((record.number.bit_length() + 7) // 8, "little")
+        if len(number) > 0xFFFF or len(record.moves) > 0xFFFF:
+            raise ValueError("The game is too long for the game log")
+        offset = os.fstat(self.log.fileno()).st_size
+        self.log.write(RECORD.pack(len(number), int(record.player_first), ALGORITHMS.index(record.algorithm),
+                                   record.score, record.bank, len(record.moves)) + number + bytes(record.moves))
+        self.log.flush()
+        self._append_index(offset, record)
+        self.flush()
+        return len(self) - 1
+
+    def flush(self) -> None:
+        for file in (self.log, self.offsets, self.numbers, self.meta):
+            file.flush()
+
+    def game(self, game_id: int) -> GameRecord:
+        self.offsets.seek(OFFSET.size * game_id)
+        return self._read_record(OFFSET.unpack(self.offsets.read(OFFSET.size))[0])[0]
+
+    def _map(self, file) -> Optional[mmap.mmap]:
+        """
+        A read-only memory map of an index column (None while it's empty). Made again for every query,
+        because the files keep growing.
+        """
+        size = os.fstat(file.fileno()).st_size
+        return mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+
+    def update_number_index(self) -> None:
+        """
+        Adds the games appended since it was last updated to <log>.by_number, SORT_CHUNK games at a time.
+        Only the new entries are sorted; they're spliced into the old ones in one pass of C-speed copies.
+        """
+        size = os.path.getsize(self.by_number_path) if os.path.exists(self.by_number_path) else 0
+        covered = size // BY_NUMBER.size
+        count = len(self)
+        if covered > count or size % BY_NUMBER.size:
+            # Doesn't belong to this log any more: start over.
+            covered = 0
+        if covered == count and size == covered * BY_NUMBER.size:
+            return
+        numbers = self._map(self.numbers)
+        with numbers:
+            for start in range(covered, count, SORT_CHUNK):
+                stop = min(start + SORT_CHUNK, count)
+                self._merge_into_number_index(
+                    start, sorted(BY_NUMBER.pack(NUMBER.unpack_from(numbers, NUMBER.size * game_id)[0], game_id)
+                                  for game_id in range(start, stop)))
+
+    def _merge_into_number_index(self, covered: int, new_entries: List[bytes]) -> None:
+        """
+        Writes <log>.by_number again with 'new_entries' (sorted) added to its first 'covered' entries.
+        The result is written next to it and renamed over it, so a crash never leaves half an index.
+        """
+        temporary_path = self.by_number_path + ".tmp"
+        with open(temporary_path, "wb") as output:
+            old = b""
+            old_file = open(self.by_number_path, "rb") if covered else None
+            try:
+                if old_file is not None:
+                    old = mmap.mmap(old_file.fileno(), covered * BY_NUMBER.size, access=mmap.ACCESS_READ)
+                entries = _SortedEntries(old)
+                start = 0
+                # All new games with the same number go to one place: after the old games with that number,
+                # since new games have bigger ids. So one binary search per number, not per game.
+                for _, group in itertools.groupby(new_entries, key=lambda entry: entry[:8]):
+                    group = list(group)
+                    position = bisect.bisect_left(entries, group[0], start)
+                    output.write(old[start * BY_NUMBER.size:position * BY_NUMBER.size])
+                    output.write(b"".join(group))
+                    start = position
+                output.write(old[start * BY_NUMBER.size:])
+            finally:
+                if old_file is not None:
+                    if old:
+                        old.close()
+                    old_file.close()
+        os.replace(temporary_path, self.by_number_path)
+
+    def games_from(self, number: int) -> List[GameRecord]:
+        """
+        All games that started from 'number', oldest first. A binary search in <log>.by_number.
+        """
+        if not len(self):
+            return []
+        self.update_number_index()
+        key = number & MASK_64
+        game_ids = []
+        with open(self.by_number_path, "rb") as file:
+            data = self._map(file)
+            with data:
+                entries = _SortedEntries(data)
+                for index in range(bisect.bisect_left(entries, BY_NUMBER.pack(key, 0)), len(entries)):
+                    entry_number, game_id = BY_NUMBER.unpack(entries[index])
+                    if entry_number != key:
+                        break
+                    game_ids.append(game_id)
+        # Numbers bigger than 64 bits can share their index entry, so check the real number too.
+        return [record for record in map(self.game, game_ids) if record.number == number]
+
+    def meta_counts(self) -> Dict[int, int]:
+        """
+        How many games have each meta byte (see the top of the file). The column is counted COUNT_CHUNK
+        bytes at a time, one C-level bytes.count per possible byte, so memory stays flat however long it is.
+        """
+        data = self._map(self.meta)
+        if data is None:
+            return {}
+        codes = [bytes([code]) for code in range(len(ALGORITHMS) << 4)]
+        counts: Dict[int, int] = {}
+        with data:
+            for start in range(0, len(data), COUNT_CHUNK):
+                chunk = data[start:start + COUNT_CHUNK]
+                for code, byte in enumerate(codes):
+                    count = chunk.count(byte)
+                    if count:
+                        counts[code] = counts.get(code, 0) + count
+        return counts
+
+    def loss_rate_by_algorithm(self) -> Dict[str, float]:
+        """
+        {algorithm: share of its games the player lost}, for algorithms with at least one game.
+        """
+        games: Dict[str, int] = {}
+        losses: Dict[str, int] = {}
+        for code, count in self.meta_counts().items():
+            algorithm = ALGORITHMS[code >> 4]
+            games[algorithm] = games.get(algorithm, 0) + count
+            if code & 4:
+                losses[algorithm] = losses.get(algorithm, 0) + count
+        return {algorithm: losses.get(algorithm, 0) / count for algorithm, count in games.items()}
+
+    def losing_first_moves(self) -> List[Tuple[int, int]]:
+        """
+        [(first move, games)] over the games the player lost, most common first.
+        The first move is the game's opening divisor, whoever made it.
+        """
+        counts: Dict[int, int] = {}
+        for code, count in self.meta_counts().items():
+            if code & 4 and code & 3:
+                divisor = FIRST_MOVES[code & 3]
+                counts[divisor] = counts.get(divisor, 0) + count
+        return sorted(counts.items(), key=lambda item: -item[1])
+
+    def close(self) -> None:
+        for file in (self.log, self.offsets, self.numbers, self.meta):
+            file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the game log.")
+    parser.add_argument("path", nargs="?", default="games.log")
+    parser.add_argument("--number", type=int, help="list the games that started from this number")
+    args = parser.parse_args()
+    log = GameLog(args.path)
+    print(f"{len(log)} games")
+    for algorithm, rate in log.loss_rate_by_algorithm().items():
+        print(f"{algorithm}: player lost {rate:.1%}")
+    losing = log.losing_first_moves()
+    if losing:
+        print(f"Most common losing first move: {losing[0][0]} ({losing[0][1]} games)")
+    if args.number is not None:
+        for record in log.games_from(args.number):
+            print(record)
+    log.close()
@@ -0,0 +1,249 @@
+import math
+from array import array
+from typing import Dict, List, Optional
+
+from logic import STANDARD_RULES, Node, RuleSet, SearchStats, factor_exponents
+
+# Bit widths used to pack a node's key into a single int while building the graph.
+_EXPONENT_BITS = 16
+_COUNTER_BITS = 20
+_SCORE_OFFSET = 1 << (_COUNTER_BITS - 1)
+# compact_graph copies a graph once at most this share of its nodes can still be reached.
+COMPACT_FRACTION = 0.5
+
+
+class GameGraph:
+    """
+    The same game graph that generate_tree builds, but stored in parallel typed arrays
+    instead of one Python object per node. Node i is described by:
+      - exponent_2[i], exponent_3[i], exponent_5[i] (the number is cofactor * 2^a * 3^b * 5^c),
+      - score[i], bank[i], divisor[i],
+      - is_first_player_move[i] (1 or 0),
+      - evaluation_value[i] (float, starts at +inf / -inf like Node),
+      - children: child_index[child_start[i]:child_start[i + 1]] (CSR layout).
+    Node 0 is the root. Children always have a bigger index than their parent.
+    """
+    def __init__(self, cofactor: int):
+        self.cofactor = cofactor
+        self.exponent_2 = array('H')
+        self.exponent_3 = array('H')
+        self.exponent_5 = array('H')
+        self.score = array('i')
+        self.bank = array('I')
+        self.divisor = array('b')
+        self.is_first_player_move = array('b')
+        self.evaluation_value = array('f')
+        self.child_start = array('I', [0])
+        self.child_index = array('I')
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def add_node(self, a: int, b: int, c: int, score: int, bank: int, divisor: int, is_first_player_move: bool) -> int:
+        """
+        Appends a node and returns its index. Its children must be added before the next node is expanded.
+        """
+        self.exponent_2.append(a)
+        self.exponent_3.append(b)
+        self.exponent_5.append(c)
+        self.score.append(score)
+        self.bank.append(bank)
+        self.divisor.append(divisor)
+        self.is_first_player_move.append(is_first_player_move)
+        self.evaluation_value.append(math.inf if is_first_player_move else -math.inf)
+        return len(self.score) - 1
+
+    def number(self, index: int) -> int:
+        return self.cofactor * 2 ** self.exponent_2[index] * 3 ** self.exponent_3[index] * 5 ** self.exponent_5[index]
+
+    def children(self, index: int) -> array:
+        return self.child_index[self.child_start[index]:self.child_start[index + 1]]
+
+    def node(self, index: int = 0) -> "GraphNode":
+        return GraphNode(self, index)
+
+    def subgraph(self, index: int) -> "GameGraph":
+        """
+        Returns a new GameGraph with only the nodes reachable from node 'index' (it becomes node 0),
+        evaluation values included. Since children always come after their parent,
+        one forward pass finds everything reachable.
+        """
+        reachable = bytearray(len(self))
+        reachable[index] = 1
+        for i in range(index, len(self)):
+            if reachable[i]:
+                for child in self.children(i):
+                    reachable[child] = 1
+        kept = [i for i in range(index, len(self)) if reachable[i]]
+        new_index = {old: new for new, old in enumerate(kept)}
+
+        graph = GameGraph(self.cofactor)
+        for old in kept:
+            graph.add_node(self.exponent_2[old], self.exponent_3[old], self.exponent_5[old], self.score[old],
+                           self.bank[old], self.divisor[old], self.is_first_player_move[old])
+            graph.evaluation_value[-1] = self.evaluation_value[old]
+            graph.child_index.extend(new_index[child] for child in self.children(old))
+            graph.child_start.append(len(graph.child_index))
+        return graph
+
+
+class GraphNode:
+    """
+    A thin Node-like view of one node of a GameGraph, so code written for Node
+    (minimax, alpha_beta, GameUI) works unchanged. Views are created on demand and hold no data themselves.
+    """
+    __slots__ = ('graph', 'index')
+
+    def __init__(self, graph: GameGraph, index: int):
+        self.graph = graph
+        self.index = index
+
+    @property
+    def number(self) -> int:
+        return self.graph.number(self.index)
+
+    @property
+    def score(self) -> int:
+        return self.graph.score[self.index]
+
+    @property
+    def bank(self) -> int:
+        return self.graph.bank[self.index]
+
+    @property
+    def divisor(self) -> int:
+        return self.graph.divisor[self.index]
+
+    @property
+    def is_first_player_move(self) -> bool:
+        return bool(self.graph.is_first_player_move[self.index])
+
+    @property
+    def evaluation_value(self) -> float:
+        return self.graph.evaluation_value[self.index]
+
+    @evaluation_value.setter
+    def evaluation_value(self, value: float) -> None:
+        self.graph.evaluation_value[self.index] = value
+
+    @property
+    def rules(self) -> RuleSet:
+        return STANDARD_RULES
+
+    @property
+    def children(self) -> List["GraphNode"]:
+        return [GraphNode(self.graph, child) for child in self.graph.children(self.index)]
+
+    def compute_final_score(self) -> int:
+        score, bank = self.score, self.bank
+        return score - bank if score % 2 == 0 else score + bank
+
+    def get_possible_moves(self) -> List[int]:
+        a = self.graph.exponent_2[self.index]
+        b = self.graph.exponent_3[self.index]
+        c = self.graph.exponent_5[self.index]
+        return [divisor for divisor, allowed in ((3, b >= 1), (4, a >= 2), (5, c >= 1)) if allowed]
+
+
+def compact_graph(node: GraphNode) -> GraphNode:
+    """
+    Returns 'node' as node 0 of a new GameGraph with only what's reachable from it, if most of its graph
+    can't be reached any more; otherwise 'node' itself, unchanged.
+    Children always come after their parent, so at most len(graph) - node.index nodes can still be reached:
+    a free bound, no scan needed. Copying only once that's at most COMPACT_FRACTION of the graph
+    keeps the copying of a whole game to about one graph's size in total, instead of a copy on every move.
+    """
+    if len(node.graph) - node.index > len(node.graph) * COMPACT_FRACTION:
+        return node
+    return node.graph.subgraph(node.index).node()
+
+
+def reroot_graph(node: GraphNode, divisor: int) -> GraphNode:
+    """
+    reroot for a GameGraph: returns the child of 'node' reached with 'divisor'. It stays a view into the same
+    graph until compact_graph finds most of the graph unreachable; then it becomes node 0 of a new,
+    smaller GameGraph, and once nothing uses the old graph any more, its arrays are freed.
+    """
+    child = next(child.index for child in node.children if child.divisor == divisor)
+    return compact_graph(GraphNode(node.graph, child))
+
+
+def _pack_key(a: int, b: int, c: int, score: int, bank: int, is_first_player_move: bool, divisor: int) -> int:
+    """
+    Same key as generate_tree uses, packed into one int (a tuple of 7 items is several times bigger).
+    """
+    key = (a << _EXPONENT_BITS | b) << _EXPONENT_BITS | c
+    key = (key << _COUNTER_BITS | (score + _SCORE_OFFSET)) << _COUNTER_BITS | bank
+    return (key << 1 | is_first_player_move) << 3 | divisor
+
+
+def build_graph(root: Node, stats: Optional[SearchStats] = None) -> GameGraph:
+    """
+    Builds the same graph as generate_tree(root), but into a GameGraph.
+    The numbers are tracked as exponents of 2, 3 and 5, so each move is a subtraction:
+      - the new number is even if a 2 is still left, so the score goes +1, otherwise -1,
+      - it ends with 0 or 5 if a 5 is still left, so the bank goes +1.
+    Nodes are expanded in the order they were added, so the BFS frontier is just an index.
+    If 'stats' is given, created and merged nodes are counted there (and building can be cancelled).
+    Only for STANDARD_RULES (the moves above are worked out for them).
+    """
+    if root.rules != STANDARD_RULES:
+        raise ValueError("build_graph only supports the standard rules, use generate_tree instead")
+    a, b, c = factor_exponents(root.number)
+    graph = GameGraph(root.number // (2 ** a * 3 ** b * 5 ** c))
+    graph.add_node(a, b, c, root.score, root.bank, root.divisor, root.is_first_player_move)
+    generated_states: Dict[int, int] = {}
+
+    frontier = 0
+    while frontier < len(graph):
+        a = graph.exponent_2[frontier]
+        b = graph.exponent_3[frontier]
+        c = graph.exponent_5[frontier]
+        score = graph.score[frontier]
+        bank = graph.bank[frontier]
+        is_first_player_move = not graph.is_first_player_move[frontier]
+        for divisor, child_a, child_b, child_c, allowed in ((3, a, b - 1, c, b >= 1),
+                                                            (4, a - 2, b, c, a >= 2),
+                                                            (5, a, b, c - 1, c >= 1)):
+            if not allowed:
+                continue
+            child_score = score + 1 if child_a >= 1 else score - 1
+            child_bank = bank + 1 if child_c >= 1 else bank
+            key = _pack_key(child_a, child_b, child_c, child_score, child_bank, is_first_player_move, divisor)
+            child = generated_states.get(key)
+            if child is None:
+                child = graph.add_node(child_a, child_b, child_c, child_score, child_bank, divisor, is_first_player_move)
+                generated_states[key] = child
+                if stats is not None:
+                    stats.generated()
+            elif stats is not None:
+                stats.duplicate_merges += 1
+            graph.child_index.append(child)
+        graph.child_start.append(len(graph.child_index))
+        frontier += 1
+
+    return graph
+
+
+def graph_minimax(graph: GameGraph, stats: Optional[SearchStats] = None) -> None:
+    """
+    Fills in evaluation_value for every node, with the same result as minimax on the root
+    (each node's own is_first_player_move says whether it maximizes).
+    Children always come after their parent, so one backwards pass over the arrays is enough:
+    no recursion and no Node objects.
+    If 'stats' is given, every node is counted as visited (depth isn't known here, so max_depth is left alone).
+    """
+    values = graph.evaluation_value
+    child_start = graph.child_start
+    child_index = graph.child_index
+    if stats is not None:
+        stats.nodes_visited += len(graph)
+    for index in range(len(graph) - 1, -1, -1):
+        start, end = child_start[index], child_start[index + 1]
+        if start == end:
+            score, bank = graph.score[index], graph.bank[index]
+            values[index] = 1 if (score + bank) % 2 == 0 else -1
+        elif graph.is_first_player_move[index]:
+            values[index] = max(values[child] for child in child_index[start:end])
+        else:
+            values[index] = min(values[child] for child in child_index[start:end])
@@ -1,6 +1,70 @@
 import random
 import math
-from typing import List 
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def ends_with_0_or_5(number: int) -> bool:
+    return number % 5 == 0
+
+
+def even_plus_odd_minus(number: int) -> int:
+    return 1 if number % 2 == 0 else -1
+
+
+class RuleSet:
+    """
+    The rules of the game, so variants can be played without code edits:
+      - divisors:   the numbers a player may divide by (only if there's no remainder),
+      - bank_rule:  bank_rule(new_number) -> True if the bank goes +1 after a move,
+      - score_rule: score_rule(new_number) -> how much the score changes after a move,
+      - modulus:    both rules may only depend on new_number % modulus (10 = the last digit).
+    Everything is compiled into two tables up front, so a move is just two lookups:
+      - move_table[number % period]:          the divisors allowed for 'number' (period = LCM of the divisors),
+      - transition_table[new_number % modulus]: (bank change, score change).
+    The rules are called with numbers 0..modulus - 1 only.
+
+    The final score and the winner are always worked out the same way (Node.compute_final_score).
+    graph.py, book.py, batch.py, retrograde.py and the lattice_* functions are worked out for
+    STANDARD_RULES only; minimax, alpha_beta, choose_move and the rest work with any rules.
+    Don't share a TranspositionTable between different rules.
+    """
+    def __init__(self, divisors: Iterable[int] = (3, 4, 5),
+                 bank_rule: Callable[[int], bool] = ends_with_0_or_5,
+                 score_rule: Callable[[int], int] = even_plus_odd_minus, modulus: int = 10):
+        self.divisors = tuple(sorted(set(divisors)))
+        if not self.divisors or self.divisors[0] < 2:
+            raise ValueError("Divisors must be 2 or bigger, or the game never ends")
+        self.period = math.lcm(*self.divisors)
+        self.modulus = modulus
+        self.move_table = tuple(tuple(divisor for divisor in self.divisors if residue % divisor == 0)
+                                for residue in range(self.period))
+        self.transition_table = tuple((1 if bank_rule(residue) else 0, score_rule(residue))
+                                      for residue in range(modulus))
+
+    def moves(self, number: int) -> Tuple[int, ...]:
+        return self.move_table[number % self.period]
+
+    def transition(self, number: int) -> Tuple[int, int]:
+        return self.transition_table[number % self.modulus]
+
+    def __eq__(self, other: object) -> bool:
+        # Compared by their tables, so a copy sent to another process still equals the original.
+        return (isinstance(other, RuleSet) and self.divisors == other.divisors
+                and self.transition_table == other.transition_table)
+
+    def __hash__(self) -> int:
+        return hash((self.divisors, self.transition_table))
+
+
+STANDARD_RULES = RuleSet()
+
+
 class Node:
     """
     Represents a state in the game tree.
@@ -11,13 +75,16 @@ class Node:
       - divisor (the last divisor used to reach this node),
       - evaluation_value (used by minimax / alpha-beta search),
       - is_first_player_move (boolean indicating whose turn it is),
-      - children (list of Node objects we can move to from here).
+      - children (list of Node objects we can move to from here),
+      - rules (the RuleSet of the game, STANDARD_RULES by default).
     """
-    def __init__(self, number: int, score: int, bank: int, divisor: int, is_first_player_move: bool):
+    def __init__(self, number: int, score: int, bank: int, divisor: int, is_first_player_move: bool,
+                 rules: RuleSet = STANDARD_RULES):
         self.number = number
         self.score = score
         self.bank = bank
         self.divisor = divisor
+        self.rules = rules
 
         # evaluation_value: used during minimax or alpha-beta. If it's first player's turn, we initialize to +∞,
         # because the MAX player tries to get the highest value.
@@ -36,20 +103,14 @@ class Node:
         Applies a move to the current node by dividing the 'number' by 'divisor' (3, 4, or 5).
         Then it updates the bank if the resulting 'number' ends with 0 or 5.
         Also updates the score: +1 if the new number is even, -1 if it's odd.
+        (Those are the standard rules; the changes come from self.rules.transition_table.)
         Finally, toggles is_first_player_move to switch turns.
         """
         self.number //= self.divisor
 
-        # Check the last digit. If it's '0' or '5', increment the bank by 1.
-        last_digit = str(self.number)[-1]
-        if last_digit in ('0', '5'):
-            self.bank += 1
-        
-        # If our new number is even, increment score; if odd, decrement score.
-        if self.number % 2 == 0:
-            self.score += 1
-        else:
-            self.score -= 1
+        bank_change, score_change = self.rules.transition(self.number)
+        self.bank += bank_change
+        self.score += score_change
 
         # Toggle which player's turn it is.
         self.is_first_player_move = not self.is_first_player_move
@@ -70,7 +131,7 @@ class Node:
         """
         Returns a list of valid divisors (3,4,5) that can divide self.number with no remainder.
         """
-        return [number for number in [3, 4, 5] if self.number % number == 0]
+        return list(self.rules.moves(self.number))
 
 
 def create_child(parent: Node, divisor: int) -> Node:
@@ -84,13 +145,29 @@ def create_child(parent: Node, divisor: int) -> Node:
         score=parent.score,
         bank=parent.bank,
         divisor=divisor,
-        is_first_player_move=parent.is_first_player_move
+        is_first_player_move=parent.is_first_player_move,
+        rules=parent.rules
     )
     child.make_move()
     return child
 
 
-def generate_tree(root: Node) -> None:
+def reroot(node: Node, divisor: int) -> Node:
+    """
+    Plays 'divisor' from 'node' and returns the child it leads to, as the new root of the game.
+    The child keeps its subtree (and the values already solved there), but 'node' lets go of
+    all its children: the other moves' subtrees can't be reached any more, so they can be freed
+    (positions they share with the child's subtree stay, the child still uses them).
+    If the children weren't generated, the child is created.
+    """
+    new_root = next((child for child in node.children if child.divisor == divisor), None)
+    if new_root is None:
+        new_root = create_child(node, divisor)
+    node.children = []
+    return new_root
+
+
+def generate_tree(root: Node, stats: Optional["SearchStats"] = None) -> None:
     """
     Builds the game tree (all possible future states) starting from 'root'.
     We use a queue for breadth-first expansion. For each node:
@@ -98,35 +175,218 @@ def generate_tree(root: Node) -> None:
       - Create a child node for each valid move,
       - Make sure we don't generate duplicates (by storing states in a dict),
       - Then add the child to our queue as well.
+    If 'stats' is given, created and merged nodes are counted there.
     """
-    queue = [root]
+    queue = deque([root])
     generated_states = {}
 
     while queue:
-        current_node = queue.pop(0)
-        for i in [3, 4, 5]:
-            if current_node.number % i == 0:
-                child = create_child(current_node, i)
-                # We define a key so we don't create duplicate children
-                key = (child.number, child.score, child.bank, child.is_first_player_move, child.divisor)
-                if key not in generated_states:
-                    generated_states[key] = child
-                    current_node.children.append(child)
-                    queue.append(child)
-                else:
-                    existing_node = generated_states[key]
-                    current_node.children.append(existing_node)
+        current_node = queue.popleft()
+        # The rules' move table gives the valid divisors (3, 4, 5 by default)
+        for i in current_node.rules.moves(current_node.number):
+            child = create_child(current_node, i)
+            # We define a key so we don't create duplicate children
+            key = (child.number, child.score, child.bank, child.is_first_player_move, child.divisor)
+            if key not in generated_states:
+                generated_states[key] = child
+                current_node.children.append(child)
+                queue.append(child)
+                if stats is not None:
+                    stats.generated()
+            else:
+                existing_node = generated_states[key]
+                current_node.children.append(existing_node)
+                if stats is not None:
+                    stats.duplicate_merges += 1
+
+
 
+class SearchCancelled(Exception):
+    """
+    Raised inside a search (or build_graph / generate_tree) when its SearchStats was cancelled.
+    """
 
 
-def minimax(node: Node, is_first_player_move: bool) -> None:
+class SearchStats:
+    """
+    Counts the work done by a search. Every engine (generate_tree, build_graph, minimax, alpha_beta,
+    lazy_alpha_beta, ...) takes an optional 'stats' argument and fills in:
+      - nodes_generated:  nodes created (tree building, or children created by the lazy search),
+      - nodes_visited:    nodes the search looked at,
+      - duplicate_merges: created positions that already existed, so the existing node was shared,
+      - cutoffs:          alpha-beta cutoffs,
+      - table_hits:       positions answered (or narrowed) by the transposition table,
+      - max_depth:        deepest ply visited (the starting node is ply 0),
+      - phase_times:      wall time of each phase, see phase(),
+      - peak_memory:      peak traced memory of each phase, only if track_memory=True (uses tracemalloc, slow).
+
+    It's also how a search running in a worker thread reports progress: the UI reads the counters
+    and elapsed(), and cancel() stops the search at its next node with SearchCancelled.
+    """
+    def __init__(self, track_memory: bool = False):
+        self.nodes_generated = 0
+        self.nodes_visited = 0
+        self.duplicate_merges = 0
+        self.cutoffs = 0
+        self.table_hits = 0
+        self.max_depth = 0
+        self.phase_times: Dict[str, float] = {}
+        self.peak_memory: Dict[str, int] = {}
+        self.track_memory = track_memory
+        self.started = time.perf_counter()
+        self.cancelled = threading.Event()
+
+    def visit(self, depth: int) -> None:
+        self.nodes_visited += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+
+    def generated(self) -> None:
+        self.nodes_generated += 1
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+
+    @property
+    def nodes(self) -> int:
+        """
+        All nodes touched so far, for progress reports.
+        """
+        return self.nodes_generated + self.nodes_visited
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times everything inside the 'with' block as phase 'name' (e.g. "generate", "search").
+        Running the same phase again adds to its time.
+        """
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.perf_counter() - started
+            if self.track_memory:
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), tracemalloc.get_traced_memory()[1])
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        lines = [
+            f"Nodes generated: {self.nodes_generated} visited: {self.nodes_visited} "
+            f"merged: {self.duplicate_merges}",
+            f"Cutoffs: {self.cutoffs} table hits: {self.table_hits} max depth: {self.max_depth}",
+        ]
+        if self.phase_times:
+            lines.append("Time: " + ", ".join(f"{name} {seconds:.3f} s" for name, seconds in self.phase_times.items()))
+        if self.peak_memory:
+            lines.append("Peak memory: " + ", ".join(f"{name} {size / 1024:.0f} KiB" for name, size in self.peak_memory.items()))
+        return "\n".join(lines)
+
+
+# Flags stored next to a value in the TranspositionTable:
+#   EXACT       - the value is the real evaluation of the position,
+#   LOWER_BOUND - the real evaluation is at least the value (the search was cut at beta),
+#   UPPER_BOUND - the real evaluation is at most the value (nothing beat alpha).
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Engines for minimax / alpha_beta:
+#   RECURSIVE - one Python call per ply (the original implementation),
+#   ITERATIVE - an explicit stack, so game depth is not limited by the recursion limit.
+RECURSIVE = "recursive"
+ITERATIVE = "iterative"
+
+
+class TranspositionTable:
+    """
+    Remembers evaluations of positions that were already searched, so that a position
+    reached by a different order of divisors (e.g. /3 then /5 versus /5 then /3) is only searched once.
+
+    The outcome of a position only depends on:
+      - number (the current integer),
+      - (score + bank) % 2 (the final score parity is all that decides the winner),
+      - whose turn it is.
+    So that's the key. The table holds at most 'max_size' entries and throws away
+    the least recently used one when it's full.
+    """
+    def __init__(self, max_size: int = 1_000_000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def make_key(node: Node, is_maximizing: bool) -> Tuple[int, int, bool]:
+        return (node.number, (node.score + node.bank) % 2, is_maximizing)
+
+    def get(self, key: Tuple[int, int, bool]) -> Optional[Tuple[int, int]]:
+        """
+        Returns (value, flag) for 'key', or None if the position is not in the table.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: Tuple[int, int, bool], value: int, flag: int = EXACT) -> None:
+        self.entries[key] = (value, flag)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            # Oldest entry is at the front of the OrderedDict.
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def minimax(node: Node, is_first_player_move: bool, table: Optional[TranspositionTable] = None,
+            engine: str = RECURSIVE, stats: Optional[SearchStats] = None, depth: int = 0) -> None:
     """
     A basic Minimax algorithm (no alpha-beta pruning).
     - If a node has no children => it's a leaf, so we compute its final score.
       If it's even => we consider that +1, else -1, as an example.
     - Otherwise, we recursively call minimax on each child, 
       and then pick the max or min among them, depending on which player's turn it is.
+    - If a 'table' is given, positions with an exact value in it are not searched again
+      (alpha-beta's bound entries are ignored).
+      Note that the children of such a position keep their initial evaluation_value.
+    - engine=ITERATIVE runs iterative_minimax instead (same result, no recursion).
+    - If 'stats' is given, the work is counted there (and the search can be cancelled).
+      'depth' is the ply of 'node', only used for those statistics.
     """
+    if engine == ITERATIVE:
+        iterative_minimax(node, is_first_player_move, table, stats)
+        return
+    if engine != RECURSIVE:
+        raise ValueError(f"Unknown engine: {engine}")
+    if stats is not None:
+        stats.visit(depth)
+
+    if table is not None:
+        key = TranspositionTable.make_key(node, is_first_player_move)
+        entry = table.get(key)
+        # Alpha-beta stores bounds in the same table; only exact values can stand in for a search.
+        if entry is not None and entry[1] == EXACT:
+            node.evaluation_value = entry[0]
+            if stats is not None:
+                stats.table_hits += 1
+            return
+
     # Base case: if no children, it's a leaf => compute the final score
     if not node.children:
         final_score = node.compute_final_score()
@@ -139,7 +399,7 @@ def minimax(node: Node, is_first_player_move: bool) -> None:
     # Otherwise, explore children
     for child in node.children:
         # Switch turn: if it's currently first player's move, next is second player's move
-        minimax(child, not is_first_player_move)
+        minimax(child, not is_first_player_move, table, RECURSIVE, stats, depth + 1)
 
     # After computing child's values, pick max or min:
     if node.children:
@@ -150,19 +410,37 @@ def minimax(node: Node, is_first_player_move: bool) -> None:
             # The 'minimizing' player => choose the worst (min) among children
             node.evaluation_value = min(child.evaluation_value for child in node.children)
 
+    if table is not None:
+        table.store(key, node.evaluation_value)
+
 
-def generate_random_numbers() -> List[int]:
+def generate_random_numbers(rules: RuleSet = STANDARD_RULES) -> List[int]:
     """
     Generates 5 random numbers in the range [40020..49980] (stepping by 60)
     because 60 is the LCM of (3,4,5). Then chooses any 5 distinct ones.
     This ensures each generated number is divisible by 3,4,5.
+    With other 'rules' it's every multiple of their divisors' LCM between 40000 and 50000.
     """
     possible_numbers = []
-    for i in range(40_020, 49_980 + 1, 60):
+    for i in range((40_000 // rules.period + 1) * rules.period, 50_000, rules.period):
         possible_numbers.append(i)
     return random.sample(possible_numbers, 5)
 
-def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
+def store_bound(table: TranspositionTable, key: Tuple[int, int, bool], value: int, alpha: int, beta: int) -> None:
+    """
+    Stores an alpha-beta result with the right flag, based on the window the search started with.
+    """
+    if value <= alpha:
+        table.store(key, value, UPPER_BOUND)
+    elif value >= beta:
+        table.store(key, value, LOWER_BOUND)
+    else:
+        table.store(key, value, EXACT)
+
+
+def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool,
+               table: Optional[TranspositionTable] = None, engine: str = RECURSIVE,
+               stats: Optional[SearchStats] = None, depth: int = 0) -> int:
     """
     Implementation of the Alpha-Beta search (an optimization over plain Minimax).
     node:        the current Node in the game tree.
@@ -175,7 +453,38 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
     Pruning logic:
     - If alpha >= beta at a MAX node, we stop exploring (beta cutoff).
     - If beta <= alpha at a MIN node, we stop exploring (alpha cutoff).
+
+    If a 'table' is given, stored values (or bounds) narrow the window before searching,
+    and the result is stored together with whether it is exact, a lower or an upper bound.
+
+    engine=ITERATIVE runs iterative_alpha_beta instead (same result, no recursion).
+    If 'stats' is given, the work is counted there; 'depth' is the ply of 'node', only used for that.
     """
+    if engine == ITERATIVE:
+        return iterative_alpha_beta(node, alpha, beta, is_maximizing, table, stats)
+    if engine != RECURSIVE:
+        raise ValueError(f"Unknown engine: {engine}")
+    if stats is not None:
+        stats.visit(depth)
+
+    if table is not None:
+        key = TranspositionTable.make_key(node, is_maximizing)
+        entry = table.get(key)
+        if entry is not None:
+            if stats is not None:
+                stats.table_hits += 1
+            value, flag = entry
+            if flag == EXACT:
+                node.evaluation_value = value
+                return value
+            if flag == LOWER_BOUND and value > alpha:
+                alpha = value
+            elif flag == UPPER_BOUND and value < beta:
+                beta = value
+            if alpha >= beta:
+                node.evaluation_value = value
+                return value
+        original_alpha, original_beta = alpha, beta
 
     # 1) If node is a leaf (no children), compute final score:
     if not node.children:
@@ -184,6 +493,8 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
             node.evaluation_value = +1
         else:
             node.evaluation_value = -1
+        if table is not None:
+            table.store(key, node.evaluation_value)
         return node.evaluation_value
 
     # 2) If it's the MAX player's turn:
@@ -191,7 +502,7 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
         value = -math.inf
         for child in node.children:
             # Recurse with is_maximizing=False, because we alternate turns
-            child_val = alpha_beta(child, alpha, beta, False)
+            child_val = alpha_beta(child, alpha, beta, False, table, RECURSIVE, stats, depth + 1)
             # Keep track of the best value so far
             if child_val > value:
                 value = child_val
@@ -200,8 +511,12 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
                 alpha = value
             # If alpha >= beta, we can stop searching further children (beta cut)
             if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
                 break
         node.evaluation_value = value
+        if table is not None:
+            store_bound(table, key, value, original_alpha, original_beta)
         return value
 
     # 3) Otherwise, it's the MIN player's turn:
@@ -209,7 +524,7 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
         value = math.inf
         for child in node.children:
             # Recurse with is_maximizing=True
-            child_val = alpha_beta(child, alpha, beta, True)
+            child_val = alpha_beta(child, alpha, beta, True, table, RECURSIVE, stats, depth + 1)
             # Keep track of the smallest value so far
             if child_val < value:
                 value = child_val
@@ -218,6 +533,515 @@ def alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool) -> int:
                 beta = value
             # If beta <= alpha, we can stop searching further (alpha cut)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
                 break
         node.evaluation_value = value
+        if table is not None:
+            store_bound(table, key, value, original_alpha, original_beta)
         return value
+
+
+def leaf_value(node: Node) -> int:
+    """
+    Evaluation of a leaf: +1 if the final score is even, -1 if it's odd.
+    """
+    return 1 if node.compute_final_score() % 2 == 0 else -1
+
+
+def iterative_minimax(node: Node, is_first_player_move: bool, table: Optional[TranspositionTable] = None,
+                      stats: Optional[SearchStats] = None) -> None:
+    """
+    Same as minimax (same evaluation_value on every visited node, same table entries),
+    but with an explicit stack instead of recursion, so any game depth works.
+    Each stack frame is [node, is_maximizing, children, next child to visit, table key].
+    """
+    stack = [[node, is_first_player_move, None, 0, None]]
+    while stack:
+        frame = stack[-1]
+        current, is_maximizing, children = frame[0], frame[1], frame[2]
+
+        # First time we see this node
+        if children is None:
+            if stats is not None:
+                stats.visit(len(stack) - 1)
+            if table is not None:
+                frame[4] = TranspositionTable.make_key(current, is_maximizing)
+                entry = table.get(frame[4])
+                if entry is not None and entry[1] == EXACT:
+                    if stats is not None:
+                        stats.table_hits += 1
+                    current.evaluation_value = entry[0]
+                    stack.pop()
+                    continue
+            children = frame[2] = current.children
+            if not children:
+                current.evaluation_value = leaf_value(current)
+                if table is not None:
+                    table.store(frame[4], current.evaluation_value)
+                stack.pop()
+                continue
+
+        # Visit the next child, if any are left
+        if frame[3] < len(children):
+            child = children[frame[3]]
+            frame[3] += 1
+            stack.append([child, not is_maximizing, None, 0, None])
+            continue
+
+        # All children are done => pick max or min
+        if is_maximizing:
+            current.evaluation_value = max(child.evaluation_value for child in children)
+        else:
+            current.evaluation_value = min(child.evaluation_value for child in children)
+        if table is not None:
+            table.store(frame[4], current.evaluation_value)
+        stack.pop()
+
+
+def iterative_alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool,
+                         table: Optional[TranspositionTable] = None, stats: Optional[SearchStats] = None) -> int:
+    """
+    Same as alpha_beta (same return value, same cutoffs, same table entries),
+    but with an explicit stack instead of recursion, so any game depth works.
+    Each stack frame is [node, is_maximizing, alpha, beta, children, next child, value, table key, original window].
+    A finished child passes its value up through 'returned'.
+    """
+    stack = [[node, is_maximizing, alpha, beta, None, 0, None, None, None]]
+    returned = None
+    while stack:
+        frame = stack[-1]
+        current, maximizing, children = frame[0], frame[1], frame[4]
+
+        # First time we see this node: table lookup, then leaf check
+        if children is None:
+            if stats is not None:
+                stats.visit(len(stack) - 1)
+            if table is not None:
+                key = frame[7] = TranspositionTable.make_key(current, maximizing)
+                entry = table.get(key)
+                if entry is not None:
+                    if stats is not None:
+                        stats.table_hits += 1
+                    value, flag = entry
+                    if flag == EXACT:
+                        current.evaluation_value = returned = value
+                        stack.pop()
+                        continue
+                    if flag == LOWER_BOUND and value > frame[2]:
+                        frame[2] = value
+                    elif flag == UPPER_BOUND and value < frame[3]:
+                        frame[3] = value
+                    if frame[2] >= frame[3]:
+                        current.evaluation_value = returned = value
+                        stack.pop()
+                        continue
+                frame[8] = (frame[2], frame[3])
+            children = frame[4] = current.children
+            if not children:
+                current.evaluation_value = returned = leaf_value(current)
+                if table is not None:
+                    table.store(frame[7], returned)
+                stack.pop()
+                continue
+            frame[6] = -math.inf if maximizing else math.inf
+        else:
+            # Back from a child: same updates as the loop in alpha_beta
+            if maximizing:
+                if returned > frame[6]:
+                    frame[6] = returned
+                if frame[6] > frame[2]:
+                    frame[2] = frame[6]
+            else:
+                if returned < frame[6]:
+                    frame[6] = returned
+                if frame[6] < frame[3]:
+                    frame[3] = frame[6]
+
+        # Visit the next child, unless there's a cutoff or none are left
+        if frame[2] < frame[3]:
+            if frame[5] < len(children):
+                child = children[frame[5]]
+                frame[5] += 1
+                stack.append([child, not maximizing, frame[2], frame[3], None, 0, None, None, None])
+                continue
+        elif stats is not None:
+            stats.cutoffs += 1
+
+        current.evaluation_value = returned = frame[6]
+        if table is not None:
+            store_bound(table, frame[7], returned, *frame[8])
+        stack.pop()
+
+    return returned
+
+
+def order_moves(node: Node, is_maximizing: bool, table: Optional[TranspositionTable] = None,
+                stats: Optional[SearchStats] = None) -> List[Node]:
+    """
+    Creates the children of 'node' (only this level, not their subtrees), most promising first:
+      - children already known (from the table) to be good for the player to move,
+      - then bigger divisors, because they end the game sooner and have smaller subtrees.
+    Trying good moves first is what lets alpha-beta cut off the rest.
+    """
+    children = [create_child(node, divisor) for divisor in node.get_possible_moves()]
+    if stats is not None:
+        for _ in children:
+            stats.generated()
+
+    def priority(child: Node) -> Tuple[int, int]:
+        known_value = 0
+        if table is not None:
+            entry = table.get(TranspositionTable.make_key(child, not is_maximizing))
+            if entry is not None:
+                known_value = entry[0]
+        # sorted() puts the smallest first, so flip the value for the MAX player.
+        return (-known_value if is_maximizing else known_value, -child.divisor)
+
+    children.sort(key=priority)
+    return children
+
+
+def lazy_alpha_beta(node: Node, alpha: int, beta: int, is_maximizing: bool,
+                    table: Optional[TranspositionTable] = None, stats: Optional[SearchStats] = None,
+                    depth: int = 0) -> int:
+    """
+    Same search as alpha_beta, but it doesn't need generate_tree:
+    children are created only when the search reaches them, and they're dropped
+    as soon as they're searched. Pruned subtrees are never built at all.
+    node.children is left empty.
+    """
+    if stats is not None:
+        stats.visit(depth)
+    if table is not None:
+        key = TranspositionTable.make_key(node, is_maximizing)
+        entry = table.get(key)
+        if entry is not None:
+            if stats is not None:
+                stats.table_hits += 1
+            value, flag = entry
+            if flag == EXACT:
+                node.evaluation_value = value
+                return value
+            if flag == LOWER_BOUND and value > alpha:
+                alpha = value
+            elif flag == UPPER_BOUND and value < beta:
+                beta = value
+            if alpha >= beta:
+                node.evaluation_value = value
+                return value
+        original_alpha, original_beta = alpha, beta
+
+    children = order_moves(node, is_maximizing, table, stats)
+
+    # Leaf: same evaluation as alpha_beta
+    if not children:
+        node.evaluation_value = leaf_value(node)
+        if table is not None:
+            table.store(key, node.evaluation_value)
+        return node.evaluation_value
+
+    value = -math.inf if is_maximizing else math.inf
+    for child in children:
+        child_val = lazy_alpha_beta(child, alpha, beta, not is_maximizing, table, stats, depth + 1)
+        if is_maximizing:
+            value = max(value, child_val)
+            alpha = max(alpha, value)
+        else:
+            value = min(value, child_val)
+            beta = min(beta, value)
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoffs += 1
+            break
+
+    node.evaluation_value = value
+    if table is not None:
+        store_bound(table, key, value, original_alpha, original_beta)
+    return value
+
+
+def choose_move(node: Node, is_maximizing: bool, table: Optional[TranspositionTable] = None,
+                stats: Optional[SearchStats] = None) -> Tuple[int, int]:
+    """
+    Searches 'node' with lazy_alpha_beta and returns (evaluation_value, best divisor).
+    The best divisor is 0 if the game is already over.
+    """
+    best_value = -math.inf if is_maximizing else math.inf
+    best_divisor = 0
+    alpha, beta = -math.inf, math.inf
+    if stats is not None:
+        stats.visit(0)
+    for child in order_moves(node, is_maximizing, table, stats):
+        child_val = lazy_alpha_beta(child, alpha, beta, not is_maximizing, table, stats, 1)
+        if is_maximizing and child_val > best_value:
+            best_value, best_divisor = child_val, child.divisor
+            alpha = max(alpha, best_value)
+        elif not is_maximizing and child_val < best_value:
+            best_value, best_divisor = child_val, child.divisor
+            beta = min(beta, best_value)
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoffs += 1
+            break
+
+    if best_divisor == 0:
+        best_value = leaf_value(node)
+    node.evaluation_value = best_value
+    return best_value, best_divisor
+
+
+class _OutOfTime(Exception):
+    """
+    Raised inside depth_limited_alpha_beta when the time budget runs out.
+    """
+
+
+def heuristic_value(node: Node) -> float:
+    """
+    A quick guess of the evaluation of 'node', used where depth_limited_alpha_beta stops searching.
+    It guesses the parity of the final score from the current (score + bank) parity and the factors left:
+      - without 5s, every move left flips the parity (score ±1, the bank doesn't change),
+      - with 5s, moves by 3 and 4 change both score and bank, so the parity stays, and
+        we guess the last 5 is taken at the very end, which flips it once.
+    Returns ±0.5: between the real values -1 and +1, so a solved position always counts more than a guess.
+    """
+    a, b, c = factor_exponents(node.number)
+    parity = (node.score + node.bank) % 2
+    if c == 0:
+        parity += a // 2 + b
+    else:
+        parity += 1
+    return 0.5 if parity % 2 == 0 else -0.5
+
+
+def depth_limited_alpha_beta(node: Node, depth: int, alpha: float, beta: float, is_maximizing: bool,
+                             deadline: float, table: Optional[TranspositionTable] = None,
+                             stats: Optional[SearchStats] = None, ply: int = 0) -> float:
+    """
+    Like lazy_alpha_beta, but stops 'depth' moves below 'node' and uses heuristic_value there.
+    Raises _OutOfTime once time.perf_counter() passes 'deadline'.
+    Only EXACT values are read from the 'table' (they are real evaluations), nothing is stored:
+    the results here can be guesses.
+    """
+    if time.perf_counter() > deadline:
+        raise _OutOfTime()
+    if stats is not None:
+        stats.visit(ply)
+    if table is not None:
+        entry = table.get(TranspositionTable.make_key(node, is_maximizing))
+        if entry is not None and entry[1] == EXACT:
+            if stats is not None:
+                stats.table_hits += 1
+            return entry[0]
+
+    if not node.get_possible_moves():
+        return leaf_value(node)
+    if depth == 0:
+        return heuristic_value(node)
+
+    value = -math.inf if is_maximizing else math.inf
+    for child in order_moves(node, is_maximizing, table, stats):
+        child_val = depth_limited_alpha_beta(child, depth - 1, alpha, beta, not is_maximizing, deadline,
+                                             table, stats, ply + 1)
+        if is_maximizing:
+            value = max(value, child_val)
+            alpha = max(alpha, value)
+        else:
+            value = min(value, child_val)
+            beta = min(beta, value)
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoffs += 1
+            break
+    return value
+
+
+def iterative_deepening(node: Node, is_maximizing: bool, budget_ms: float,
+                        table: Optional[TranspositionTable] = None,
+                        stats: Optional[SearchStats] = None) -> Tuple[float, int]:
+    """
+    Anytime search: runs depth_limited_alpha_beta with depth 1, 2, 3, ... until 'budget_ms' milliseconds
+    are used up, and returns (evaluation, best divisor) of the deepest search that finished.
+    The best move of the previous depth is searched first, which makes the next depth cut off more.
+
+    Depth 1 always finishes (it's at most 3 guesses), so there is always a move. It stops early when
+    the value is exactly ±1 (the game is solved) or the search reached the end of the game:
+    with the standard rules every game from a position lasts exactly a // 2 + b + c more moves,
+    whatever is played (with other rules, every move at least halves the number).
+    Like choose_move, the best divisor is 0 if the game is already over.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    if node.rules == STANDARD_RULES:
+        a, b, c = factor_exponents(node.number)
+        moves_left = a // 2 + b + c
+    else:
+        moves_left = node.number.bit_length()
+    children = order_moves(node, is_maximizing, table, stats)
+    if not children:
+        node.evaluation_value = leaf_value(node)
+        return node.evaluation_value, 0
+
+    best_value, best_divisor = None, 0
+    for depth in range(1, moves_left + 1):
+        iteration_value, iteration_divisor = None, 0
+        alpha, beta = -math.inf, math.inf
+        try:
+            for child in children:
+                child_val = depth_limited_alpha_beta(child, depth - 1, alpha, beta, not is_maximizing,
+                                                     deadline if depth > 1 else math.inf, table, stats, 1)
+                if iteration_value is None or (child_val > iteration_value if is_maximizing
+                                               else child_val < iteration_value):
+                    iteration_value, iteration_divisor = child_val, child.divisor
+                if is_maximizing:
+                    alpha = max(alpha, iteration_value)
+                else:
+                    beta = min(beta, iteration_value)
+        except _OutOfTime:
+            break
+        best_value, best_divisor = iteration_value, iteration_divisor
+        if abs(best_value) == 1:
+            break
+        # Principal move first in the next iteration.
+        children.sort(key=lambda child: child.divisor != best_divisor)
+
+    node.evaluation_value = best_value
+    return best_value, best_divisor
+
+
+def factor_exponents(number: int) -> Tuple[int, int, int]:
+    """
+    Returns the exponents (a, b, c) of 2, 3 and 5 in 'number'.
+    The remaining factor of the number never changes the game: no move can divide it away,
+    and it is never even or a multiple of 5.
+    """
+    # Lowest set bit gives the power of 2 without dividing thousands of digits one by one.
+    a = (number & -number).bit_length() - 1
+    number >>= a
+    b = 0
+    while number % 3 == 0:
+        number //= 3
+        b += 1
+    c = 0
+    while number % 5 == 0:
+        number //= 5
+        c += 1
+    return a, b, c
+
+
+def lattice_value(a: int, b: int, c: int, parity: int, is_maximizing: bool) -> int:
+    """
+    Evaluates a position on the (a, b, c, parity) lattice, without building any Node objects.
+    a, b, c:       exponents of 2, 3 and 5 in the current number.
+    parity:        (score + bank) % 2 of the current position.
+    is_maximizing: True if it's the maximizing player's turn.
+
+    Returns +1 / -1, exactly like minimax would for the same position.
+
+    Why this works:
+    - Dividing by 3 or 4 never touches the factor 5, so both add 1 to the score (±1) and
+      1 to the bank when a 5 is still present: they change the parity by the same amount.
+      So only m = a // 2 + b (the number of such moves left) matters, not a and b on their own.
+    - While two or more 5s are left, every move changes the parity by 2, so nothing changes.
+    - Taking the last 5 flips the parity once, and after that each of the m moves left flips it again.
+    Solving that small game by hand gives the cases below.
+    """
+    m = a // 2 + b
+    parity %= 2
+    if c == 0:
+        # No choices matter any more: every remaining move flips the parity once.
+        wins = (parity + m) % 2 == 0
+    elif c == 1:
+        # Whoever takes the last 5 decides how many flips are left after it.
+        if is_maximizing:
+            wins = parity == 1 or m % 2 == 1
+        else:
+            wins = parity == 1 and m % 2 == 0
+    else:
+        wins = parity == 1
+    return 1 if wins else -1
+
+
+def lattice_minimax(number: int, score: int, bank: int, is_first_player_move: bool) -> int:
+    """
+    Same result as minimax(Node(number, score, bank, 0, is_first_player_move), is_first_player_move),
+    but works on the exponents of 2, 3 and 5 instead of the game tree,
+    so numbers with thousands of digits are solved instantly.
+    """
+    a, b, c = factor_exponents(number)
+    return lattice_value(a, b, c, (score + bank) % 2, is_first_player_move)
+
+
+def lattice_best_move(number: int, score: int, bank: int, is_first_player_move: bool) -> Tuple[int, int]:
+    """
+    Returns (evaluation_value, best divisor) for the position, like choose_move, but on the lattice.
+    The best divisor is 0 if the game is already over. Like choose_move, bigger divisors win ties.
+    """
+    a, b, c = factor_exponents(number)
+    parity = (score + bank) % 2
+    best_value, best_divisor = None, 0
+    for divisor, child_a, child_b, child_c, allowed in ((5, a, b, c - 1, c >= 1),
+                                                        (4, a - 2, b, c, a >= 2),
+                                                        (3, a, b - 1, c, b >= 1)):
+        if not allowed:
+            continue
+        # The score changes by 1 every move; the bank by 1 more if a 5 is still left.
+        child_parity = parity + 1 + (1 if child_c >= 1 else 0)
+        value = lattice_value(child_a, child_b, child_c, child_parity, not is_first_player_move)
+        if best_value is None or (value > best_value if is_first_player_move else value < best_value):
+            best_value, best_divisor = value, divisor
+
+    if best_value is None:
+        best_value = lattice_value(a, b, c, parity, is_first_player_move)
+    return best_value, best_divisor
+
+
+@lru_cache(maxsize=1_000_000)
+def distance_to_result(number: int, parity: int, is_maximizing: bool,
+                       rules: RuleSet = STANDARD_RULES) -> Tuple[int, int]:
+    """
+    Returns (evaluation_value, plies to the end of the game) of a position under optimal play:
+    the winner ends the game as soon as it can, the loser drags it out as long as it can.
+    Only (score + bank) % 2 matters, so that's all 'parity' is. Results are cached, so asking again
+    (e.g. every time the UI is redrawn) costs nothing.
+
+    With the standard rules it's instant even for huge numbers: the value comes from the lattice,
+    and every game from a position lasts exactly a // 2 + b + c more moves, whatever is played.
+    Other rules are solved move by move (each position once, thanks to the cache).
+    """
+    if rules == STANDARD_RULES:
+        a, b, c = factor_exponents(number)
+        return lattice_value(a, b, c, parity, is_maximizing), a // 2 + b + c
+
+    moves = rules.moves(number)
+    if not moves:
+        return (1 if parity % 2 == 0 else -1), 0
+    winning_value = 1 if is_maximizing else -1
+    best = None
+    for value, plies in (explain_move(number, parity, is_maximizing, divisor, rules) for divisor in moves):
+        # Winning beats losing; a quicker win or a slower loss is better.
+        rank = (value == winning_value, -plies if value == winning_value else plies)
+        if best is None or rank > best[0]:
+            best = (rank, (value, plies))
+    return best[1]
+
+
+def explain_move(number: int, parity: int, is_maximizing: bool, divisor: int,
+                 rules: RuleSet = STANDARD_RULES) -> Tuple[int, int]:
+    """
+    (evaluation_value, plies to the end) after playing 'divisor', this move included.
+    """
+    child = number // divisor
+    bank_change, score_change = rules.transition(child)
+    value, plies = distance_to_result(child, (parity + bank_change + score_change) % 2, not is_maximizing, rules)
+    return value, plies + 1
+
+
+def explain_moves(node: Node, is_maximizing: bool) -> List[Tuple[int, int, int]]:
+    """
+    [(divisor, evaluation_value, plies to the end)] for every legal move from 'node',
+    what the engine knows about each move without searching again.
+    """
+    parity = (node.score + node.bank) % 2
+    return [(divisor, *explain_move(node.number, parity, is_maximizing, divisor, node.rules))
+            for divisor in node.get_possible_moves()]
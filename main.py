@@ -1,10 +1,25 @@
 import tkinter as tk
-from logic import generate_random_numbers, Node, generate_tree, minimax, alpha_beta
+from logic import generate_random_numbers, Node, minimax, TranspositionTable, choose_move, ITERATIVE, \
+    SearchStats, SearchCancelled, lattice_best_move, iterative_deepening, reroot, explain_moves
+from graph import build_graph, compact_graph, GraphNode, reroot_graph
+from book import OpeningBook
+from gamelog import GameLog, GameRecord
+from typing import Callable, Optional
 import math
+import os
+import threading
 window = tk.Tk()
 window.title("MIP praktika 1")
 window.geometry("800x800")
 COMPUTER_DELAY = 500
+# How often (ms) the UI checks on a search running in the background.
+PROGRESS_INTERVAL = 100
+# Time (ms) the "Iterative deepening" algorithm may think about each move.
+MOVE_BUDGET_MS = 1000
+# Written by `python book.py`. If it's there, the computer answers from it instead of searching.
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+# Every finished game is added to this log (query it with `python gamelog.py`).
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games.log")
 
 class GameUI:
     def __init__(self, window: tk.Tk):
@@ -33,6 +48,19 @@ class GameUI:
         self.algorithm_frame = tk.LabelFrame(self.window, text="Select the algorithm")
 
         self.selected_divider = tk.IntVar()
+        # Analysis mode: show next to every divider how the game ends after it.
+        self.explain_enabled = tk.BooleanVar()
+        self.explain_enabled.set(False)
+
+        # Shared by every game in this window, so restarting with a number we've seen before is almost free.
+        self.transposition_table = TranspositionTable()
+        self.opening_book = OpeningBook(BOOK_PATH) if os.path.exists(BOOK_PATH) else None
+        self.game_log = GameLog(LOG_PATH)
+        # Statistics (and progress) of the search running in the background, None if nothing is running.
+        self.running_search = None
+        # Statistics of the up-front tree solve, and a summary of the work behind the computer's last move.
+        self.tree_stats = None
+        self.stats_text = ""
 
         self.generate_initial_ui()
 
@@ -53,7 +81,7 @@ class GameUI:
         
         # --- Frame for algorithm options ---
         self.algorithm_frame.pack(pady=(0, 20), anchor='center')  
-        algorithm_options = ["Minimax", "Alpha-beta"]
+        algorithm_options = ["Minimax", "Alpha-beta", "Iterative deepening"]
         for i in algorithm_options:
             radio = tk.Radiobutton(self.algorithm_frame, text=i, variable=self.selected_algorithm, value=i)
             radio.pack(pady=5, anchor='center')
@@ -81,6 +109,24 @@ class GameUI:
             self.final_message.destroy()
         if hasattr(self, 'restart_game_button'):
             self.restart_game_button.destroy()
+        if hasattr(self, 'stats_label'):
+            self.stats_label.destroy()
+        if hasattr(self, 'explain_button'):
+            self.explain_button.destroy()
+        self.clear_progress_ui()
+
+    def clear_progress_ui(self) -> None:
+        if hasattr(self, 'progress_label'):
+            self.progress_label.destroy()
+        if hasattr(self, 'cancel_button'):
+            self.cancel_button.destroy()
+
+    def draw_progress_ui(self) -> None:
+        self.clear_progress_ui()
+        self.progress_label = tk.Label(self.window, text="Searching...")
+        self.progress_label.pack(anchor='center', pady=2)
+        self.cancel_button = tk.Button(self.window, text="Cancel search", command=self.cancel_search)
+        self.cancel_button.pack(anchor='center', pady=2)
 
     def draw_ui(self) -> None:
         possible_moves = self.state.get_possible_moves()
@@ -92,6 +138,7 @@ class GameUI:
                                             justify='center'
                                           )
             self.final_message.pack(anchor='center', pady=2)
+            self.log_game()
 
             self.restart_game_button = tk.Button(self.window, text ="Restart the game", command=self.restart_game)
             self.restart_game_button.pack(anchor='center', pady=10)
@@ -112,10 +159,50 @@ class GameUI:
 
         self.dividers_frame = tk.LabelFrame(self.window, text="Select the divider")
         self.dividers_frame.pack(pady=(0, 20), anchor='center')  
+        explanations = self.move_explanations() if self.explain_enabled.get() else {}
         for i in possible_moves:
-            radio = tk.Radiobutton(self.dividers_frame, text=i, variable=self.selected_divider, value=i, command=self.on_divider_selected, state= tk.NORMAL if self.is_first_player_move else tk.DISABLED)
+            radio = tk.Radiobutton(self.dividers_frame, text=explanations.get(i, i), variable=self.selected_divider, value=i, command=self.on_divider_selected, state= tk.NORMAL if self.is_first_player_move else tk.DISABLED)
             radio.pack(pady=5, anchor='center')
 
+        self.explain_button = tk.Checkbutton(self.window, text="Explain moves", variable=self.explain_enabled, command=self.redraw)
+        self.explain_button.pack(anchor='center', pady=2)
+
+        if self.stats_text:
+            self.stats_label = tk.Label(self.window, text=self.stats_text, justify='center')
+            self.stats_label.pack(anchor='center', pady=2)
+
+        if self.running_search is not None:
+            self.draw_progress_ui()
+
+    def move_explanations(self) -> dict:
+        """
+        {divisor: text} with the outcome of every legal move under optimal play, seen from the player
+        (the maximizing side). Comes from the cached distance_to_result, so redrawing doesn't search again.
+        """
+        explanations = {}
+        for divisor, value, plies in explain_moves(self.state, self.is_first_player_move):
+            outcome = "you win" if value == 1 else "you lose"
+            explanations[divisor] = f"{divisor}: {outcome}, game over in {plies} {'move' if plies == 1 else 'moves'}"
+        return explanations
+
+    def redraw(self) -> None:
+        self.clear_ui()
+        self.draw_ui()
+
+    def log_game(self) -> None:
+        """
+        Adds the finished game to the game log (once, even if the final screen is drawn again).
+        """
+        if self.game_logged:
+            return
+        number, player_first, algorithm = self.game_start
+        if self.book_moves and not self.searched_moves:
+            # The selected algorithm never played: every computer move came from the book.
+            algorithm = "Opening book"
+        self.game_log.append(GameRecord(number, player_first, algorithm, tuple(self.moves),
+                                        self.state.score, self.state.bank))
+        self.game_logged = True
+
     def restart_game(self) -> None:
         self.initial_generated_numbers = generate_random_numbers()
         self.initial_number.set(self.initial_generated_numbers[0])
@@ -132,32 +219,123 @@ class GameUI:
     def start_game(self) -> None:
         self.is_first_player_move = True if self.first_move.get() == "Player" else False
         self.state = Node(self.initial_number.get(), 0, 0, 0, self.is_first_player_move)
-        generate_tree(self.state)
-
-        if self.selected_algorithm.get() == "Minimax":
-            minimax(self.state, self.is_first_player_move)
-        else:
-            alpha_beta(self.state, -math.inf, math.inf, self.is_first_player_move)
+        # The book covers every position reachable from the positions in it, so no tree is needed then.
+        in_book = self.opening_book is not None and self.opening_book.lookup(self.state, self.is_first_player_move)
+        # Divisors played so far, so we can find our position in the tree once it's ready.
+        self.moves = []
+        self.tree_stats = None
+        self.stats_text = ""
+        # What the game log needs to know about this game besides the moves.
+        self.game_start = (self.state.number, self.is_first_player_move, self.selected_algorithm.get())
+        self.game_logged = False
+        # Where the computer's moves came from: the opening book, or a search with the selected algorithm.
+        self.book_moves = 0
+        self.searched_moves = 0
 
         # When the game starts remove the previous ui and show current state of the game
         self.start_number_frame.destroy()
         self.first_move_frame.destroy()
         self.algorithm_frame.destroy()
         self.start_game_button.destroy()
-        
+
+        if self.selected_algorithm.get() == "Minimax" and not in_book:
+            # Minimax visits every position anyway, so the whole tree is built up front
+            # (as a compact GameGraph; self.state becomes a Node-like view into it).
+            # That runs in the background: the player can already make moves meanwhile.
+            # Alpha-beta searches lazily from the current position on each computer move instead.
+            root = self.state
+            self.run_in_background(lambda stats: self.solve_tree(root, stats), self.on_tree_solved)
+
         self.draw_ui()
 
         if not self.is_first_player_move:
             self.window.after(COMPUTER_DELAY, self.computer_turn)
 
     
+    def run_in_background(self, task: Callable[[SearchStats], object], on_done: Callable[[object], None]) -> None:
+        """
+        Runs task(stats) in a worker thread, so the window doesn't freeze while it searches.
+        The UI polls it every PROGRESS_INTERVAL ms (Tk must only be used from this thread),
+        and calls on_done(result) when it's finished, or on_done(None) if it was cancelled.
+        """
+        self.running_search = stats = SearchStats()
+        result = {}
+
+        def worker() -> None:
+            try:
+                result['value'] = task(stats)
+            except SearchCancelled:
+                pass
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        self.window.after(PROGRESS_INTERVAL, self.poll_background, thread, result, on_done)
+
+    def poll_background(self, thread: threading.Thread, result: dict, on_done: Callable[[object], None]) -> None:
+        stats = self.running_search
+        if thread.is_alive():
+            if hasattr(self, 'progress_label'):
+                self.progress_label.config(text=f"Searching... {stats.nodes} nodes, {stats.elapsed():.1f} s")
+            self.window.after(PROGRESS_INTERVAL, self.poll_background, thread, result, on_done)
+            return
+        self.running_search = None
+        self.clear_progress_ui()
+        self.last_stats = stats
+        on_done(result.get('value'))
+
+    def cancel_search(self) -> None:
+        if self.running_search is not None:
+            self.running_search.cancel()
+
+    def solve_tree(self, root: Node, stats: SearchStats) -> Node:
+        """
+        Builds and solves the whole game from 'root'. Runs in the worker thread.
+        """
+        with stats.phase("generate"):
+            state = build_graph(root, stats).node()
+        with stats.phase("search"):
+            minimax(state, root.is_first_player_move, self.transposition_table, ITERATIVE, stats)
+        return state
+
+    def search_move(self, state: Node, is_maximizing: bool, algorithm: str, stats: SearchStats) -> int:
+        """
+        Finds the computer's move with the lazy alpha-beta search, or with iterative deepening
+        (at most MOVE_BUDGET_MS) if that's the 'algorithm'. Runs in the worker thread.
+        """
+        with stats.phase("search"):
+            if algorithm == "Iterative deepening":
+                return iterative_deepening(state, is_maximizing, MOVE_BUDGET_MS, self.transposition_table, stats)[1]
+            return choose_move(state, is_maximizing, self.transposition_table, stats)[1]
+
+    def on_tree_solved(self, state: Optional[Node]) -> None:
+        """
+        Switches over to the solved tree, following the moves played while it was being solved
+        (the unreachable part is dropped once it's most of the graph, see compact_graph).
+        If it was cancelled we just stay without a tree, and the computer searches lazily instead.
+        """
+        if state is None:
+            return
+        self.tree_stats = self.last_stats
+        for divisor in self.moves:
+            state = next(child for child in state.children if child.divisor == divisor)
+        self.state = compact_graph(state)
+
+    def move_to(self, divisor: int) -> None:
+        """
+        Moves self.state to the child reached with 'divisor' and makes it the new root:
+        the parts of the tree the game can't reach any more are dropped (from a GameGraph only once
+        they're most of it, so a move doesn't copy the graph), the solved rest is kept.
+        If no tree was built (alpha-beta, opening book, or still solving), the child is created on the spot.
+        """
+        self.moves.append(divisor)
+        if isinstance(self.state, GraphNode):
+            self.state = reroot_graph(self.state, divisor)
+        else:
+            self.state = reroot(self.state, divisor)
+
     def on_divider_selected(self) -> None:
-        selected_divider = self.selected_divider.get()
-        for i in self.state.children:
-            if i.divisor == selected_divider:
-                self.state = i
-                break
-        
+        self.move_to(self.selected_divider.get())
+
         self.is_first_player_move = not self.is_first_player_move
         self.clear_ui()
         self.draw_ui()
@@ -170,6 +348,44 @@ class GameUI:
         # which side is the computer right now. If is_first_player_move = True => it's MAX's turn,
         # if False => it's MIN's turn. But you might store a separate boolean if you want the
         # computer always to be second, etc.
+        if self.running_search is not None:
+            # The tree is still being solved in the background, check again later.
+            self.window.after(PROGRESS_INTERVAL, self.computer_turn)
+            return
+
+        best_divisor = None
+        if self.opening_book is not None:
+            entry = self.opening_book.lookup(self.state, self.is_first_player_move)
+            if entry is not None:
+                best_divisor = entry[1]
+
+        if best_divisor is None and (self.selected_algorithm.get() != "Minimax" or not self.state.children):
+            # The search tells us the move directly, no tree needed. It runs in the background too.
+            self.searched_moves += 1
+            state, is_maximizing, algorithm = self.state, self.is_first_player_move, self.selected_algorithm.get()
+            self.run_in_background(lambda stats: self.search_move(state, is_maximizing, algorithm, stats),
+                                   self.on_move_searched)
+            self.draw_progress_ui()
+            return
+
+        # 0 means the game is already over, nothing to move.
+        if best_divisor:
+            self.book_moves += 1
+            self.stats_text = "Move taken from the opening book"
+            self.finish_computer_turn(best_divisor)
+            return
+
+        self.searched_moves += 1
+        # Positions found in the transposition table were not searched again, so their
+        # children may not have a value yet. Evaluate them now (mostly table hits).
+        stats = SearchStats()
+        with stats.phase("search"):
+            for child in self.state.children:
+                minimax(child, not self.is_first_player_move, self.transposition_table, ITERATIVE, stats, 1)
+        self.stats_text = f"This move:\n{stats.summary()}"
+        if self.tree_stats is not None:
+            self.stats_text = f"Tree solved up front:\n{self.tree_stats.summary()}\n{self.stats_text}"
+
         if self.is_first_player_move:
             #The computer is the MAX player
             # Choose the child with the highest evaluation_value
@@ -180,7 +396,7 @@ class GameUI:
                     highest_value = children.evaluation_value
                     best_child = children
             if best_child:
-                self.state = best_child
+                self.move_to(best_child.divisor)
         else:
             # The computer is the MIN player
             # Choose the child with the lowest evaluation_value
@@ -191,7 +407,27 @@ class GameUI:
                     lowest_value = children.evaluation_value
                     best_child = children
             if best_child:
-                self.state = best_child
+                self.move_to(best_child.divisor)
+        self.is_first_player_move = not self.is_first_player_move
+        self.clear_ui()
+        self.draw_ui()
+
+    def on_move_searched(self, best_divisor: Optional[int]) -> None:
+        self.stats_text = f"This move:\n{self.last_stats.summary()}"
+        if best_divisor is None:
+            self.stats_text += "\n(search cancelled)"
+        self.finish_computer_turn(best_divisor)
+
+    def finish_computer_turn(self, best_divisor: Optional[int]) -> None:
+        """
+        Plays the computer's move. None means the search was cancelled:
+        then the lattice solver answers instead, which is instant.
+        """
+        if best_divisor is None:
+            _, best_divisor = lattice_best_move(self.state.number, self.state.score, self.state.bank,
+                                                self.is_first_player_move)
+        if best_divisor:
+            self.move_to(best_divisor)
         self.is_first_player_move = not self.is_first_player_move
         self.clear_ui()
         self.draw_ui()
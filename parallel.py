@@ -0,0 +1,216 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from logic import Node, SearchCancelled, SearchStats, TranspositionTable, lazy_alpha_beta, leaf_value, order_moves
+
+# Set in every worker process by _init_worker.
+_shared_bound = None
+_worker_table = None
+# A running task looks at the shared bound again after this many visited nodes.
+BOUND_CHECK_INTERVAL = 64
+
+
+def _init_worker(shared_bound) -> None:
+    global _shared_bound, _worker_table
+    _shared_bound = shared_bound
+    # One table per worker, kept between its tasks: stored bounds stay valid for any window.
+    _worker_table = TranspositionTable()
+
+
+class _BoundMoved(Exception):
+    """
+    Raised inside a task's search when the shared bound changed since its window was set.
+    """
+
+
+class _BoundWatchStats(SearchStats):
+    """
+    SearchStats that also watches the shared bound: lazy_alpha_beta calls visit() at every node,
+    and every BOUND_CHECK_INTERVAL nodes the bound is compared with the one the window was made from.
+    """
+    def __init__(self):
+        super().__init__()
+        self.window_bound = None
+
+    def visit(self, depth: int) -> None:
+        super().visit(depth)
+        if self.nodes_visited % BOUND_CHECK_INTERVAL == 0 and _shared_bound.value != self.window_bound:
+            raise _BoundMoved()
+
+
+def _interval(value: int, alpha: float, beta: float) -> Tuple[int, int]:
+    """
+    What an alpha-beta result says about the real evaluation (always -1 or +1): (lowest, highest) it can be.
+    """
+    if value <= alpha:
+        return -1, value
+    if value >= beta:
+        return value, 1
+    return value, value
+
+
+def _search_task(node: Node, is_maximizing: bool, root_is_maximizing: bool,
+                 depth: int) -> Tuple[int, int, Dict[str, int]]:
+    """
+    Searches one split-off position inside a worker. The window comes from the bound shared by all
+    workers (the best the root player is already sure to get), so the workers prune each other's work.
+    When another worker improves the bound during the search, the search starts again with the narrower
+    window; what it already found stays in the worker's table, so little is searched twice.
+    Without a shared bound (share_bound=False) the window is always open.
+    Returns the (lowest, highest) possible evaluation and the work counters.
+    """
+    if _shared_bound is None:
+        stats = SearchStats()
+        value = lazy_alpha_beta(node, -math.inf, math.inf, is_maximizing, _worker_table, stats, depth)
+        return value, value, _counters(stats)
+
+    stats = _BoundWatchStats()
+    while True:
+        stats.window_bound = _shared_bound.value
+        if root_is_maximizing:
+            alpha, beta = stats.window_bound, math.inf
+        else:
+            alpha, beta = -math.inf, stats.window_bound
+        try:
+            value = lazy_alpha_beta(node, alpha, beta, is_maximizing, _worker_table, stats, depth)
+        except _BoundMoved:
+            continue
+        low, high = _interval(value, alpha, beta)
+        return low, high, _counters(stats)
+
+
+def _counters(stats: SearchStats) -> Dict[str, int]:
+    return {
+        "nodes_generated": stats.nodes_generated,
+        "nodes_visited": stats.nodes_visited,
+        "cutoffs": stats.cutoffs,
+        "table_hits": stats.table_hits,
+        "max_depth": stats.max_depth,
+    }
+
+
+def _add_counters(stats: SearchStats, counters: Dict[str, int]) -> None:
+    stats.nodes_generated += counters["nodes_generated"]
+    stats.nodes_visited += counters["nodes_visited"]
+    stats.cutoffs += counters["cutoffs"]
+    stats.table_hits += counters["table_hits"]
+    stats.max_depth = max(stats.max_depth, counters["max_depth"])
+
+
+def parallel_choose_move(node: Node, is_maximizing: bool, table: Optional[TranspositionTable] = None,
+                         stats: Optional[SearchStats] = None, workers: Optional[int] = None,
+                         split_depth: int = 2, share_bound: bool = True) -> Tuple[int, int]:
+    """
+    Same as choose_move (same (evaluation_value, best divisor), bit for bit), but the moves at the root
+    (split_depth=1) or the moves after those (split_depth=2) are searched in parallel by a process pool.
+
+    All workers share the best value the root player is already sure to get. Every task takes its
+    alpha-beta window from it, and running tasks look at it again as they search (see _search_task),
+    so a good result in one worker lets the others prune, even when every task runs at the same time.
+    share_bound=False turns that off (open windows everywhere), to measure what the sharing saves.
+    A narrowed window only gives a bound for a move, not always its exact value; when that bound
+    could still change which move choose_move picks, the move is searched again here with the full window.
+    'table' is only used here (move ordering and those searches), every worker has its own.
+    """
+    workers = workers or os.cpu_count() or 1
+    if stats is not None:
+        stats.visit(0)
+    children = order_moves(node, is_maximizing, table, stats)
+    if not children:
+        node.evaluation_value = leaf_value(node)
+        return node.evaluation_value, 0
+
+    # Tasks: (child index, position to search, whose turn it is there, its ply)
+    tasks = []
+    intervals: List[Optional[Tuple[int, int]]] = [None] * len(children)
+    for index, child in enumerate(children):
+        grandchildren = order_moves(child, not is_maximizing, table, stats) if split_depth >= 2 else []
+        if split_depth >= 2 and not grandchildren:
+            value = leaf_value(child)
+            intervals[index] = (value, value)
+        elif grandchildren:
+            tasks.extend((index, grandchild, is_maximizing, 2) for grandchild in grandchildren)
+        else:
+            tasks.append((index, child, not is_maximizing, 1))
+
+    shared_bound = multiprocessing.Value('d', -math.inf if is_maximizing else math.inf) if share_bound else None
+    pending_tasks = [0] * len(children)
+    child_results: List[List[Tuple[int, int]]] = [[] for _ in children]
+    for index, _, _, _ in tasks:
+        pending_tasks[index] += 1
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared_bound,))
+    try:
+        futures = {executor.submit(_search_task, position, is_max, is_maximizing, depth): index
+                   for index, position, is_max, depth in tasks}
+        remaining = set(futures)
+        while remaining:
+            done, remaining = wait(remaining, timeout=0.1, return_when=FIRST_COMPLETED)
+            if stats is not None and stats.cancelled.is_set():
+                raise SearchCancelled()
+            for future in done:
+                index = futures[future]
+                low, high, counters = future.result()
+                if stats is not None:
+                    _add_counters(stats, counters)
+                child_results[index].append((low, high))
+                pending_tasks[index] -= 1
+                if pending_tasks[index]:
+                    continue
+                if split_depth >= 2:
+                    # The child's player picks among the grandchildren: combine their bounds the same way.
+                    pick = min if is_maximizing else max
+                    intervals[index] = (pick(low for low, _ in child_results[index]),
+                                        pick(high for _, high in child_results[index]))
+                else:
+                    intervals[index] = child_results[index][0]
+                if shared_bound is None:
+                    continue
+                # The root player is sure to get at least this child's worst case.
+                with shared_bound.get_lock():
+                    if is_maximizing:
+                        shared_bound.value = max(shared_bound.value, intervals[index][0])
+                    else:
+                        shared_bound.value = min(shared_bound.value, intervals[index][1])
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return _resolve(node, is_maximizing, children, intervals, table, stats)
+
+
+def _resolve(node: Node, is_maximizing: bool, children: List[Node], intervals: List[Tuple[int, int]],
+             table: Optional[TranspositionTable], stats: Optional[SearchStats]) -> Tuple[int, int]:
+    """
+    Picks the move choose_move would: the first child (in search order) with the best evaluation.
+    Children that surely aren't the best are skipped, the others are searched again if only a bound is known.
+    """
+    if is_maximizing:
+        sure_value = max(low for low, _ in intervals)
+        candidates = [i for i, (_, high) in enumerate(intervals) if high >= sure_value]
+    else:
+        sure_value = min(high for _, high in intervals)
+        candidates = [i for i, (low, _) in enumerate(intervals) if low <= sure_value]
+
+    best_value, best_divisor = None, 0
+    for position, index in enumerate(candidates):
+        low, high = intervals[index]
+        if low == high:
+            value = low
+        else:
+            value = lazy_alpha_beta(children[index], -math.inf, math.inf, not is_maximizing, table, stats, 1)
+        if best_value is None or (value > best_value if is_maximizing else value < best_value):
+            best_value, best_divisor = value, children[index].divisor
+        # Later children can only take over with a strictly better value.
+        later = candidates[position + 1:]
+        if not later:
+            break
+        if is_maximizing and best_value >= max(intervals[i][1] for i in later):
+            break
+        if not is_maximizing and best_value <= min(intervals[i][0] for i in later):
+            break
+
+    node.evaluation_value = best_value
+    return best_value, best_divisor
@@ -0,0 +1,117 @@
+"""
+Retrograde analysis of the whole game with NumPy (needs `pip install numpy`; the game itself doesn't).
+
+Instead of searching every starting number on its own, we solve every position of the
+(k, b, c, parity, side) lattice at once, going backwards from the end of the game:
+  - k = a // 2 (how many times we can still divide by 4), b and c are the exponents of 3 and 5,
+  - parity = (score + bank) % 2, side = 1 if it's the maximizing player's turn.
+That's all a position's outcome depends on (see logic.lattice_value). The only terminal position
+is k = b = c = 0, where the final score parity decides (as in Node.compute_final_score).
+Each pass over the arrays settles every position with one more move left, so after
+k + b + c passes everything is solved. Any number of starting numbers is then one lookup each.
+"""
+from typing import Tuple
+
+import numpy as np
+
+# Values outside the +1 / -1 range, used when a move isn't possible.
+_NO_MOVE_FOR_MAX = -2
+_NO_MOVE_FOR_MIN = 2
+
+
+def solve_lattice(max_k: int, max_b: int, max_c: int) -> np.ndarray:
+    """
+    Returns an int8 array 'values' of shape (max_k + 1, max_b + 1, max_c + 1, 2, 2), where
+    values[k, b, c, parity, side] is the evaluation_value minimax would give that position.
+    """
+    shape = (max_k + 1, max_b + 1, max_c + 1, 2, 2)
+    values = np.zeros(shape, dtype=np.int8)
+    # At the end of the game an even final score wins: terminal[parity].
+    terminal = np.array([1, -1], dtype=np.int8)
+
+    for _ in range(max_k + max_b + max_c + 1):
+        # swapped[..., p, s] = values[..., p, 1 - s]   (the child is the other player's turn)
+        # flipped[..., p, s] = values[..., 1 - p, 1 - s]
+        swapped = values[..., ::-1]
+        flipped = swapped[..., ::-1, :]
+
+        best_max = np.full(shape[:3] + (2,), _NO_MOVE_FOR_MAX, dtype=np.int8)
+        best_min = np.full(shape[:3] + (2,), _NO_MOVE_FOR_MIN, dtype=np.int8)
+        # The score changes by 1 every move, so only the bank decides if the parity flips:
+        # it does exactly when no 5 is left after the move.
+
+        def consider(target: Tuple[slice, ...], child: np.ndarray) -> None:
+            np.maximum(best_max[target], child[..., 1], out=best_max[target])
+            np.minimum(best_min[target], child[..., 0], out=best_min[target])
+
+        # Divide by 3: b - 1, parity flips if there's no 5.
+        consider((slice(None), slice(1, None), slice(0, 1)), flipped[:, :-1, 0:1])
+        consider((slice(None), slice(1, None), slice(1, None)), swapped[:, :-1, 1:])
+        # Divide by 4: k - 1, parity flips if there's no 5.
+        consider((slice(1, None), slice(None), slice(0, 1)), flipped[:-1, :, 0:1])
+        consider((slice(1, None), slice(None), slice(1, None)), swapped[:-1, :, 1:])
+        # Divide by 5: c - 1, parity flips if that was the last 5.
+        consider((slice(None), slice(None), slice(1, 2)), flipped[:, :, 0:1])
+        consider((slice(None), slice(None), slice(2, None)), swapped[:, :, 1:-1])
+
+        values = np.stack([best_min, best_max], axis=-1)
+        values[0, 0, 0, :, :] = terminal[:, None]
+
+    return values
+
+
+def factor_exponents(numbers: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized logic.factor_exponents: the exponents of 2, 3 and 5 of every (positive int64) number.
+    Raises ValueError if any number is 0 or negative.
+    """
+    remaining = np.array(numbers, dtype=np.int64)
+    # 0 is divisible by everything, so the loops below would never end on it.
+    if (remaining < 1).any():
+        raise ValueError("Every number must be positive")
+    exponents = []
+    for prime in (2, 3, 5):
+        exponent = np.zeros(remaining.shape, dtype=np.int64)
+        divisible = remaining % prime == 0
+        while divisible.any():
+            exponent += divisible
+            remaining = np.where(divisible, remaining // prime, remaining)
+            divisible = remaining % prime == 0
+        exponents.append(exponent)
+    return exponents[0], exponents[1], exponents[2]
+
+
+def evaluate_numbers(numbers: np.ndarray, is_first_player_move: bool = True, parity: int = 0) -> np.ndarray:
+    """
+    Returns the evaluation_value (+1 / -1) of every starting number, like minimax on Node(number, 0, 0, 0, ...)
+    would. 'parity' is (score + bank) % 2 if the game doesn't start from 0 / 0.
+    """
+    a, b, c = factor_exponents(numbers)
+    k = a // 2
+    values = solve_lattice(int(k.max(initial=0)), int(b.max(initial=0)), int(c.max(initial=0)))
+    return values[k, b, c, parity, int(is_first_player_move)]
+
+
+def win_map(start: int, stop: int, step: int = 1, is_first_player_move: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (numbers, values) for every starting number in range(start, stop, step).
+    """
+    numbers = np.arange(start, stop, step, dtype=np.int64)
+    return numbers, evaluate_numbers(numbers, is_first_player_move)
+
+
+def fair_sample(start: int, stop: int, step: int, count: int, is_first_player_move: bool = True,
+                rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Draws 'count' starting numbers from range(start, stop, step), half of them won and half lost
+    for the maximizing player (as close to half as the range allows), instead of blindly
+    like generate_random_numbers.
+    """
+    rng = rng or np.random.default_rng()
+    numbers, values = win_map(start, stop, step, is_first_player_move)
+    wins, losses = numbers[values == 1], numbers[values == -1]
+    win_count = min(len(wins), max(count - len(losses), count // 2))
+    chosen = np.concatenate([rng.choice(wins, win_count, replace=False),
+                             rng.choice(losses, min(count - win_count, len(losses)), replace=False)])
+    rng.shuffle(chosen)
+    return chosen
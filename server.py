@@ -0,0 +1,229 @@
+"""
+Headless game server: many games at once over a local socket, no Tk.
+
+Every request and response is one JSON object per line. Requests have an "op" and may carry an "id",
+which is sent back unchanged so a client can have several requests in flight:
+
+    {"op": "new", "number": 48300, "first": "player"}  -> {"ok": true, "session": 1, "state": {...}}
+    {"op": "move", "session": 1, "divisor": 3}         -> {"ok": true, "computer_move": 4, "state": {...}}
+    {"op": "state", "session": 1}                      -> {"ok": true, "state": {...}}
+    {"op": "close", "session": 1}                      -> {"ok": true}
+
+Like GameUI, the player is the maximizing side and the computer answers right after each move.
+Errors come back as {"ok": false, "error": "..."}. Sessions end with their connection.
+
+    python server.py --port 8765          # TCP on localhost
+    python server.py --unix /tmp/mip.sock # Unix socket
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+
+from logic import Node, create_child, generate_random_numbers, lattice_best_move
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Longest request line accepted.
+LINE_LIMIT = 64 * 1024
+# Biggest starting number accepted, in bits (the number is factored for every computer move).
+MAX_NUMBER_BITS = 4096
+
+
+@lru_cache(maxsize=1_000_000)
+def solve_position(number: int, parity: int, is_maximizing: bool) -> Tuple[int, int]:
+    """
+    (evaluation_value, best divisor) for a position, shared by every session of the process.
+    Sessions always play the standard rules, so the position is solved on the lattice: no tree search,
+    just the exponents of 2, 3 and 5, and the same answer (ties included) as choose_move.
+    Only (score + bank) % 2 matters for the outcome, so positions that differ only in score and bank
+    share one entry. lru_cache is thread-safe, so the executor threads can all use it.
+    """
+    return lattice_best_move(number, parity, 0, is_maximizing)
+
+
+class Session:
+    """
+    One game: just the current position and whose turn it is, no tree.
+    is_player_turn works like GameUI.is_first_player_move: the player maximizes.
+    """
+    __slots__ = ('state', 'is_player_turn')
+
+    def __init__(self, number: int, is_player_turn: bool):
+        self.state = Node(number, 0, 0, 0, is_player_turn)
+        self.is_player_turn = is_player_turn
+
+    def play(self, divisor: int) -> None:
+        self.state = create_child(self.state, divisor)
+        self.is_player_turn = not self.is_player_turn
+
+    def to_json(self) -> dict:
+        moves = self.state.get_possible_moves()
+        result = {
+            "number": self.state.number,
+            "score": self.state.score,
+            "bank": self.state.bank,
+            "moves": moves,
+            "turn": "player" if self.is_player_turn else "computer",
+            "game_over": not moves,
+        }
+        if not moves:
+            result["final_score"] = self.state.compute_final_score()
+            result["winner"] = "player" if result["final_score"] % 2 == 0 else "computer"
+        return result
+
+
+class RequestError(Exception):
+    """
+    A bad request; the message is sent back to the client.
+    """
+
+
+class GameServer:
+    """
+    Holds every session. Requests from all connections are handled on one asyncio loop;
+    only the searches go to the thread pool, so a slow search doesn't hold up other games.
+    """
+    def __init__(self, workers: Optional[int] = None):
+        self.sessions: Dict[int, Session] = {}
+        self.session_ids = itertools.count(1)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def computer_move(self, session: Session) -> int:
+        state = session.state
+        _, divisor = await asyncio.get_running_loop().run_in_executor(
+            self.executor, solve_position, state.number, (state.score + state.bank) % 2, session.is_player_turn)
+        session.play(divisor)
+        return divisor
+
+    def get_session(self, request: dict, owned: Set[int]) -> Tuple[int, Session]:
+        session_id = request.get("session")
+        if not isinstance(session_id, int) or session_id not in owned:
+            raise RequestError(f"Unknown session: {session_id}")
+        return session_id, self.sessions[session_id]
+
+    async def handle(self, request: dict, owned: Set[int]) -> dict:
+        op = request.get("op")
+        if op == "new":
+            number = request.get("number")
+            if number is None:
+                number = random.choice(generate_random_numbers())
+            # bool is a subclass of int, but true / false isn't a number.
+            if not isinstance(number, int) or isinstance(number, bool) or number < 1:
+                raise RequestError("'number' must be a positive integer")
+            if number.bit_length() > MAX_NUMBER_BITS:
+                raise RequestError(f"'number' can have at most {MAX_NUMBER_BITS} bits")
+            first = request.get("first", "player")
+            if first not in ("player", "computer"):
+                raise RequestError("'first' must be 'player' or 'computer'")
+            session_id = next(self.session_ids)
+            session = Session(number, first == "player")
+            self.sessions[session_id] = session
+            owned.add(session_id)
+            response = {"session": session_id}
+            if not session.is_player_turn and session.state.get_possible_moves():
+                response["computer_move"] = await self.computer_move(session)
+            response["state"] = session.to_json()
+            return response
+
+        if op == "move":
+            _, session = self.get_session(request, owned)
+            divisor = request.get("divisor")
+            if not session.is_player_turn:
+                raise RequestError("It's not the player's turn")
+            # 3.0 == 3, so check the type first: create_child needs an int.
+            if (not isinstance(divisor, int) or isinstance(divisor, bool)
+                    or divisor not in session.state.get_possible_moves()):
+                raise RequestError(f"Invalid move: {divisor}")
+            session.play(divisor)
+            response = {}
+            if session.state.get_possible_moves():
+                response["computer_move"] = await self.computer_move(session)
+            response["state"] = session.to_json()
+            return response
+
+        if op == "state":
+            _, session = self.get_session(request, owned)
+            return {"state": session.to_json()}
+
+        if op == "close":
+            session_id, _ = self.get_session(request, owned)
+            owned.discard(session_id)
+            del self.sessions[session_id]
+            return {}
+
+        raise RequestError(f"Unknown op: {op}")
+
+    async def respond(self, line: bytes, owned: Set[int], writer: asyncio.StreamWriter) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("A request must be a JSON object")
+            request_id = request.get("id")
+            response = {"ok": True, **await self.handle(request, owned)}
+        except (ValueError, RequestError) as error:
+            response = {"ok": False, "error": str(error)}
+        except Exception as error:
+            # Still answer, so the client isn't left waiting for this id.
+            response = {"ok": False, "error": f"Internal error: {error!r}"}
+        if request_id is not None:
+            response["id"] = request_id
+        # Nobody is left to read answers that finish after the client disconnected.
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b"\n")
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Reads requests until the client disconnects. Every request gets its own task, so a client
+        can send the next one before the answer arrives (answers can then come back in another order).
+        """
+        owned: Set[int] = set()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, owned, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.gather(*tasks)
+                await writer.drain()
+        except ConnectionError:
+            # The client went away; its sessions are dropped below like after a normal disconnect.
+            pass
+        finally:
+            for session_id in owned:
+                del self.sessions[session_id]
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None) -> None:
+        if path is not None:
+            server = await asyncio.start_unix_server(self.serve_connection, path, limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.serve_connection, host, port, limit=LINE_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve games as JSON lines over a local socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, help="threads for the searches")
+    args = parser.parse_args()
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}", flush=True)
+    asyncio.run(GameServer(args.workers).serve(args.host, args.port, args.unix))
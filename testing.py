@@ -1,64 +1,76 @@
-import random
-from logic import generate_random_numbers, Node, generate_tree, minimax, alpha_beta
-def console_game(root: Node, first_move: bool) -> None:
+import os
+from typing import Optional
+from logic import generate_random_numbers, Node, generate_tree, minimax, alpha_beta, reroot, choose_move, SearchStats
+from book import OpeningBook
+from export import traverse
+from gamelog import GameLog, GameRecord
+def console_game(root: Node, first_move: bool, book: Optional[OpeningBook] = None, log: Optional[GameLog] = None) -> None:
     print("Welcome to the game")
     print(f"The game starts with the number {root_number}")
 
     current_node = root
     is_first_player_move = first_move
     output_message = "Player" if is_first_player_move else "Computer"
+    moves = []
+    book_moves = 0
 
     while True:
         dividable_number = 0
         print(f"Current number : {current_node.number} Current score : {current_node.score} Current bank : {current_node.bank}")	
         if is_first_player_move:
-            available_moves = [number for number in [3, 4, 5] if current_node.number % number == 0]
+            available_moves = current_node.get_possible_moves()
             dividable_number = input(f"Enter dividable number {available_moves}: ")
 
             dividable_number = int(dividable_number)
             print("Player chose", dividable_number)
         else:
             print("Computer thinking")
-            best_move = 0
-            for child in current_node.children:
-                if child.evaluation_value == -1:
-                    best_move = child.number
-                    break
-            if best_move == 0:
+            # The computer is the minimizing player; the book (or else the search) returns the move directly.
+            entry = book.lookup(current_node, is_first_player_move) if book is not None else None
+            if entry is not None:
+                print("Move taken from the opening book")
+                evaluation_value, best_move = entry
+                book_moves += 1
+            else:
+                stats = SearchStats()
+                with stats.phase("search"):
+                    evaluation_value, best_move = choose_move(current_node, is_first_player_move, stats=stats)
+                print(stats.summary())
+            if evaluation_value != -1:
                 print("There are no best moves for computer")
-                best_move = random.choice([number for number in [3, 4, 5] if current_node.number % number == 0])
-            best_move = int(current_node.number / best_move)
             print("Computer chose", best_move)
 
             dividable_number = best_move
 
            
 
-        if current_node.number % dividable_number != 0:
+        if dividable_number not in current_node.get_possible_moves():
             print("Invalid move")
             continue
 
-        resulted_number = current_node.number // dividable_number
+        # Keep only the part of the tree still reachable, so memory goes down as the game goes on.
+        current_node = reroot(current_node, dividable_number)
+        moves.append(dividable_number)
 
-        for i in current_node.children:
-            if i.number == resulted_number:
-                current_node = i
-                break
-        
         is_first_player_move = not is_first_player_move
-        if not current_node.children:
+        if not current_node.get_possible_moves():
             print(f"Game over")
             if current_node.compute_final_score() % 2 == 0:
                 print(f"{output_message} wins")
             else:
                 print(f"{output_message} loses")
             print(f" Number: {current_node.number} Score: {current_node.score} Bank: {current_node.bank} Final score : {current_node.compute_final_score()} ")
+            if log is not None:
+                # The computer plays with choose_move (alpha-beta) here, unless the book answered every move.
+                computer_moves = len(moves) // 2 if first_move else (len(moves) + 1) // 2
+                algorithm = "Opening book" if book_moves and book_moves == computer_moves else "Alpha-beta"
+                log.append(GameRecord(root.number, first_move, algorithm, tuple(moves),
+                                      current_node.score, current_node.bank))
             break
 
 def print_tree(root: Node) -> None:
-    queue = [root]
-    while queue:
-        node = queue.pop(0)
+    # traverse() yields every position once, even the ones generate_tree shares between paths.
+    for _, node, _ in traverse(root):
         if not node.children:
             print(f" Number : {node.number} Score : {node.score} Bank : {node.bank}, final_score: {node.compute_final_score()}, evaluation_value: {node.evaluation_value}, divisor: {node.divisor}")
         else:
@@ -73,16 +85,20 @@ def print_tree(root: Node) -> None:
                 f"children_bank : {[children.bank for children in node.children ]} "
                 f"divisor : {node.divisor} "
             )
-           
-        for child in node.children:
-            queue.append(child)
 
 if __name__ == "__main__":
     root_number = 48300
     is_first_player_move = True
     root = Node(root_number, 0, 0, 0, is_first_player_move)
-    generate_tree(root)
-    minimax(root, is_first_player_move)
+    stats = SearchStats(track_memory=True)
+    with stats.phase("generate"):
+        generate_tree(root, stats)
+    with stats.phase("search"):
+        minimax(root, is_first_player_move, stats=stats)
     print_tree(root)
+    print(stats.summary())
     #alpha_beta(root, -math.inf, math.inf, is_first_player_move)
-    console_game(root, is_first_player_move)
+    book = OpeningBook("opening_book.bin") if os.path.exists("opening_book.bin") else None
+    log = GameLog("games.log")
+    console_game(root, is_first_player_move, book, log)
+    log.close()
@@ -0,0 +1,250 @@
+"""
+Self-play tournament between computer strategies.
+
+    python tournament.py --games 10000 --seed 1
+    python tournament.py --strategies alpha_beta random --games 100000 --workers 8 --output results.jsonl
+
+Every ordered pair of different strategies plays 'games' games, one as the maximizing player
+and one as the minimizing. Like in GameUI, either side can open: game i starts from the same number,
+with the same side moving first, for every pair, and all the randomness of a game comes from the seed
+and i, so any game can be replayed exactly. Finished games are written
+to the output file (one JSON object per line) as soon as their chunk is done, and a summary with
+win rates, game lengths and games/s is printed at the end.
+
+A strategy is a function (node, is_maximizing, rng) -> divisor. Besides the names in STRATEGIES,
+"module:function" loads one from any module.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from logic import Node, choose_move, create_child, generate_tree, leaf_value, minimax
+
+Strategy = Callable[[Node, bool, random.Random], int]
+
+DEFAULT_OUTPUT = "tournament_results.jsonl"
+# Games per task sent to a worker process.
+CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def _minimax_value(number: int, parity: int, is_maximizing: bool) -> int:
+    """
+    minimax on the full tree of a position. Cached per process: only (score + bank) % 2 matters,
+    so every game reaching the same number with the same parity shares the result.
+    """
+    node = Node(number, parity, 0, 0, is_maximizing)
+    generate_tree(node)
+    minimax(node, is_maximizing)
+    return node.evaluation_value
+
+
+@lru_cache(maxsize=None)
+def _alpha_beta_move(number: int, parity: int, is_maximizing: bool) -> int:
+    return choose_move(Node(number, parity, 0, 0, is_maximizing), is_maximizing)[1]
+
+
+def _child_values(node: Node, is_maximizing: bool) -> List[Tuple[int, int]]:
+    """
+    (divisor, minimax value) of every move, in the order generate_tree creates the children.
+    """
+    values = []
+    for divisor in node.get_possible_moves():
+        child = create_child(node, divisor)
+        values.append((divisor, _minimax_value(child.number, (child.score + child.bank) % 2, not is_maximizing)))
+    return values
+
+
+def minimax_strategy(node: Node, is_maximizing: bool, rng: random.Random) -> int:
+    """
+    GameUI.computer_turn: the first child with the best evaluation_value.
+    """
+    best_value, best_divisor = None, 0
+    for divisor, value in _child_values(node, is_maximizing):
+        if best_value is None or (value > best_value if is_maximizing else value < best_value):
+            best_value, best_divisor = value, divisor
+    return best_divisor
+
+
+def alpha_beta_strategy(node: Node, is_maximizing: bool, rng: random.Random) -> int:
+    """
+    choose_move: lazy alpha-beta, bigger divisors first.
+    """
+    return _alpha_beta_move(node.number, (node.score + node.bank) % 2, is_maximizing)
+
+
+def random_strategy(node: Node, is_maximizing: bool, rng: random.Random) -> int:
+    return rng.choice(node.get_possible_moves())
+
+
+def console_strategy(node: Node, is_maximizing: bool, rng: random.Random) -> int:
+    """
+    The original testing.console_game computer: the first child that wins for it, otherwise a random move.
+    """
+    winning_value = 1 if is_maximizing else -1
+    for divisor, value in _child_values(node, is_maximizing):
+        if value == winning_value:
+            return divisor
+    return rng.choice(node.get_possible_moves())
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "minimax": minimax_strategy,
+    "alpha_beta": alpha_beta_strategy,
+    "random": random_strategy,
+    "console": console_strategy,
+}
+
+
+def load_strategy(name: str) -> Strategy:
+    """
+    Returns STRATEGIES[name], or the function named by "module:function".
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    if ":" not in name:
+        raise ValueError(f"Unknown strategy: {name}")
+    module, function = name.split(":", 1)
+    return getattr(importlib.import_module(module), function)
+
+
+def starting_number(seed: int, game: int) -> int:
+    """
+    The starting number of game 'game', the same for every pair of strategies.
+    Picked like generate_random_numbers (a multiple of 60 in [40020..49980]), but with its own
+    random.Random, so the caller's global random state is left alone.
+    """
+    return random.Random(f"{seed}-{game}").choice(range(40_020, 49_980 + 1, 60))
+
+
+def max_moves_first(seed: int, game: int) -> bool:
+    """
+    Whether the maximizing side opens game 'game' (GameUI's "Player" first) or the minimizing one
+    ("Computer" first). Drawn per game like starting_number, so both setups get about half the games.
+    """
+    return random.Random(f"{seed}-{game}-first").random() < 0.5
+
+
+def play_game(max_strategy: Strategy, min_strategy: Strategy, number: int, rng: random.Random,
+              max_first: bool = True) -> Tuple[int, int]:
+    """
+    Plays one game from 'number', the maximizing player first unless max_first is False. Returns (result, length):
+    result is +1 if the maximizing player won (even final score), -1 otherwise; length is the number of moves.
+    """
+    node = Node(number, 0, 0, 0, max_first)
+    is_maximizing = max_first
+    length = 0
+    while node.get_possible_moves():
+        strategy = max_strategy if is_maximizing else min_strategy
+        divisor = strategy(node, is_maximizing, rng)
+        if divisor not in node.get_possible_moves():
+            raise ValueError(f"Strategy played an invalid move: {divisor} on {node.number}")
+        node = create_child(node, divisor)
+        is_maximizing = not is_maximizing
+        length += 1
+    return leaf_value(node), length
+
+
+def _play_chunk(max_name: str, min_name: str, seed: int, games: range) -> List[dict]:
+    max_strategy, min_strategy = load_strategy(max_name), load_strategy(min_name)
+    records = []
+    for game in games:
+        number = starting_number(seed, game)
+        max_first = max_moves_first(seed, game)
+        rng = random.Random(f"{seed}-{game}-{max_name}-{min_name}")
+        result, length = play_game(max_strategy, min_strategy, number, rng, max_first)
+        records.append({"game": game, "max": max_name, "min": min_name, "first": "max" if max_first else "min",
+                        "number": number, "winner": "max" if result == 1 else "min", "length": length})
+    return records
+
+
+class Summary:
+    """
+    Running totals of the finished games, per (max strategy, min strategy, side that moved first).
+    """
+    def __init__(self):
+        self.games: Dict[Tuple[str, str, str], int] = {}
+        self.max_wins: Dict[Tuple[str, str, str], int] = {}
+        self.total_length: Dict[Tuple[str, str, str], int] = {}
+
+    def add(self, record: dict) -> None:
+        pair = (record["max"], record["min"], record["first"])
+        self.games[pair] = self.games.get(pair, 0) + 1
+        self.max_wins[pair] = self.max_wins.get(pair, 0) + (record["winner"] == "max")
+        self.total_length[pair] = self.total_length.get(pair, 0) + record["length"]
+
+    def report(self, seconds: float) -> str:
+        lines = [f"{'max':>12} {'min':>12} {'first':>5} {'games':>9} {'max wins':>9} {'min wins':>9} {'length':>7}"]
+        wins: Dict[str, int] = {}
+        played: Dict[str, int] = {}
+        first_wins: Dict[str, int] = {}
+        first_played: Dict[str, int] = {}
+        for (max_name, min_name, first), games in sorted(self.games.items()):
+            max_wins = self.max_wins[(max_name, min_name, first)]
+            lines.append(f"{max_name:>12} {min_name:>12} {first:>5} {games:9} {max_wins / games:9.1%} "
+                         f"{1 - max_wins / games:9.1%} {self.total_length[(max_name, min_name, first)] / games:7.2f}")
+            first_wins[first] = first_wins.get(first, 0) + (max_wins if first == "max" else games - max_wins)
+            first_played[first] = first_played.get(first, 0) + games
+            wins[max_name] = wins.get(max_name, 0) + max_wins
+            wins[min_name] = wins.get(min_name, 0) + games - max_wins
+            played[max_name] = played.get(max_name, 0) + games
+            played[min_name] = played.get(min_name, 0) + games
+        lines.append("Overall win rate: " + ", ".join(f"{name} {wins[name] / played[name]:.1%}" for name in sorted(played)))
+        lines.append("Side moving first wins: " + ", ".join(
+            f"{first} first {first_wins[first] / first_played[first]:.1%}" for first in sorted(first_played)))
+        total = sum(self.games.values())
+        lines.append(f"{total} games in {seconds:.2f} s: {total / seconds if seconds > 0 else 0:.0f} games/s")
+        return "\n".join(lines)
+
+
+def run_tournament(strategies: List[str], games: int, seed: int = 0, workers: Optional[int] = None,
+                   output: str = DEFAULT_OUTPUT) -> Summary:
+    """
+    Plays 'games' games for every ordered pair of different strategies, over 'workers' processes
+    (all CPUs by default, 1 = no pool), streaming every finished game to 'output'.
+    """
+    for name in strategies:
+        load_strategy(name)
+    pairs = list(itertools.permutations(strategies, 2)) or [(strategies[0], strategies[0])]
+    tasks = [(max_name, min_name, seed, range(start, min(start + CHUNK_SIZE, games)))
+             for max_name, min_name in pairs for start in range(0, games, CHUNK_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    summary = Summary()
+
+    with open(output, "w") as file:
+        def write(records: List[dict]) -> None:
+            for record in records:
+                summary.add(record)
+                file.write(json.dumps(record) + "\n")
+            file.flush()
+
+        if workers == 1:
+            for task in tasks:
+                write(_play_chunk(*task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for future in as_completed([executor.submit(_play_chunk, *task) for task in tasks]):
+                    write(future.result())
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-play tournament between computer strategies.")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES),
+                        help="names from STRATEGIES or module:function")
+    parser.add_argument("--games", type=int, default=1000, help="games per pair of strategies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    result = run_tournament(args.strategies, args.games, args.seed, args.workers, args.output)
+    print(result.report(time.perf_counter() - started))
+    print(f"Games written to {args.output}")